@@ -29,6 +29,7 @@ class AboutAdminForm(forms.ModelForm):
 
 class AboutAdmin(admin.ModelAdmin):
     list_display = ('id', 'user',)
+    list_select_related = ('user',)
     form = AboutAdminForm
     empty_value_display = '-пусто-'
 
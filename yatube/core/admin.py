@@ -0,0 +1,62 @@
+"""Инструменты админки для больших таблиц."""
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+
+from core.paginators import EstimatedCountPaginator
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """Фильтр по связи с поиском вместо списка всех объектов.
+
+    Выбор делается виджетом автодополнения админки, поэтому связанная
+    модель должна быть зарегистрирована с search_fields. Из базы
+    загружается только выбранный объект.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        self.widget = self.make_widget(field, model_admin.admin_site)
+        self.preserved_params = [
+            (key, value) for key, values in request.GET.lists()
+            if key not in (self.lookup_kwarg, self.lookup_kwarg_isnull, 'p')
+            for value in values
+        ]
+
+    @staticmethod
+    def make_widget(field, admin_site):
+        widget = AutocompleteSelect(field, admin_site)
+        widget.choices = field.formfield().choices
+        return widget
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def rendered_widget(self):
+        return self.widget.render(self.lookup_kwarg, self.lookup_val, {
+            'id': f'autocomplete_filter_{self.lookup_kwarg}',
+        })
+
+
+class LargeTableAdminMixin:
+    """Список без точного COUNT(*) и с фильтрами-автодополнениями."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if (isinstance(list_filter, (list, tuple))
+                    and issubclass(list_filter[1], AutocompleteFilter)):
+                field = self.model._meta.get_field(list_filter[0])
+                return media + AutocompleteFilter.make_widget(
+                    field, self.admin_site
+                ).media
+        return media
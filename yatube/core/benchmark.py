@@ -0,0 +1,274 @@
+"""Замеры представлений posts, about и users на синтетических данных.
+
+Каждый URL запрашивается один раз после очистки кэша (холодный запрос)
+и затем repeat раз подряд. Для повторных запросов записываются медиана
+и 95-й перцентиль времени ответа, число SQL-запросов, их время и
+размер ответа. Запросы, меняющие данные, выполняются в транзакции,
+которая откатывается, поэтому все замеры идут на одних данных.
+
+Результаты сравниваются с бюджетом из VIEW_BUDGET_FILE. Лишний
+SQL-запрос — всегда нарушение бюджета; время и размер ответа могут
+вырасти не больше чем на допуск.
+"""
+import json
+import math
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import get_resolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from about.models import About, Tech
+from posts.models import AuthorStats, Follow, Group, Post
+
+User = get_user_model()
+
+NAMESPACES = ('posts', 'about', 'users')
+QUERY_METRICS = ('cold_queries', 'queries')
+TIMING_METRICS = ('sql_ms', 'p50_ms', 'p95_ms')
+METRICS = QUERY_METRICS + TIMING_METRICS + ('bytes',)
+# Запас в миллисекундах, чтобы шум не ломал проверку быстрых страниц
+TIMING_SLACK_MS = 5.0
+DEFAULT_TOLERANCE = 0.5
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class ViewCase:
+    """Запрос к одному URL: метод, путь, данные формы.
+
+    fresh_login нужен представлениям, которые завершают сессию.
+    """
+
+    def __init__(self, path, method='get', data=None, fresh_login=False):
+        self.path = path
+        self.method = method
+        self.data = data or {}
+        self.fresh_login = fresh_login
+
+
+def url_names(namespaces=NAMESPACES) -> set:
+    """Имена всех URL из пространств имен namespaces."""
+    resolver = get_resolver()
+    return {
+        f'{namespace}:{name}'
+        for namespace in namespaces
+        for name in resolver.namespace_dict[namespace][1].reverse_dict
+        if isinstance(name, str)
+    }
+
+
+def pick_user():
+    """Самый активный автор, у которого есть подписки."""
+    stats = AuthorStats.objects.filter(
+        author__follower__isnull=False
+    ).order_by('-posts_count', 'author').select_related('author').first()
+    if stats is None:
+        raise BenchmarkError(
+            'Нет автора с подписками: заполните базу seed_benchmark_data'
+        )
+    return stats.author
+
+
+def make_cases(user) -> dict:
+    """Запросы ко всем URL из NAMESPACES от имени user."""
+    post = Post.objects.order_by('-comments_count', 'pk').only('pk').first()
+    own_post = Post.objects.filter(author=user).order_by('-pk').only(
+        'pk'
+    ).first()
+    group = Group.objects.order_by('-posts_count', 'pk').first()
+    followed = Follow.objects.filter(user=user).order_by('pk').select_related(
+        'author'
+    ).first().author
+    stranger = User.objects.exclude(pk=user.pk).exclude(
+        following__user=user
+    ).order_by('pk').first() or followed
+    about = About.objects.order_by('pk').first()
+    tech = Tech.objects.order_by('number').first()
+    if None in (post, group, about, tech):
+        raise BenchmarkError('В базе нет записей, групп или страниц about')
+    # Вход обновляет last_login, и токен самого user перестает работать
+    uidb64 = urlsafe_base64_encode(force_bytes(followed.pk))
+    token = default_token_generator.make_token(followed)
+    return {
+        'posts:index': ViewCase(reverse('posts:index')),
+        'posts:group_list': ViewCase(
+            reverse('posts:group_list', args=(group.slug,))
+        ),
+        'posts:profile': ViewCase(
+            reverse('posts:profile', args=(user.username,))
+        ),
+        'posts:post_detail': ViewCase(
+            reverse('posts:post_detail', args=(post.pk,))
+        ),
+        'posts:comments': ViewCase(
+            reverse('posts:comments', args=(post.pk,))
+        ),
+        'posts:post_create': ViewCase(reverse('posts:post_create')),
+        'posts:post_edit': ViewCase(
+            reverse('posts:post_edit', args=(own_post.pk,))
+        ),
+        'posts:post_delete': ViewCase(
+            reverse('posts:post_delete', args=(own_post.pk,))
+        ),
+        'posts:add_comment': ViewCase(
+            reverse('posts:add_comment', args=(post.pk,)), 'post',
+            {'text': 'Комментарий для замера'}
+        ),
+        'posts:follow_index': ViewCase(reverse('posts:follow_index')),
+        'posts:profile_follow': ViewCase(
+            reverse('posts:profile_follow', args=(stranger.username,))
+        ),
+        'posts:profile_unfollow': ViewCase(
+            reverse('posts:profile_unfollow', args=(followed.username,))
+        ),
+        'about:author': ViewCase(reverse('about:author', args=(about.pk,))),
+        'about:tech': ViewCase(reverse('about:tech', args=(tech.number,))),
+        'users:logout': ViewCase(
+            reverse('users:logout'), 'post', fresh_login=True
+        ),
+        'users:signup': ViewCase(reverse('users:signup')),
+        'users:login': ViewCase(reverse('users:login')),
+        'users:password_reset': ViewCase(reverse('users:password_reset')),
+        'users:password_reset_done': ViewCase(
+            reverse('users:password_reset_done')
+        ),
+        'users:password_reset_confirm': ViewCase(
+            reverse('users:password_reset_confirm', args=(uidb64, token))
+        ),
+        'users:password_reset_complete': ViewCase(
+            reverse('users:password_reset_complete')
+        ),
+        'users:password_change': ViewCase(reverse('users:password_change')),
+        'users:password_change_done': ViewCase(
+            reverse('users:password_change_done')
+        ),
+    }
+
+
+def percentile(values, percent) -> float:
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+class QueryTimer:
+    """Обертка выполнения SQL: считает запросы и их время.
+
+    В отличие от connection.queries время не округляется до
+    миллисекунд и не нужен DEBUG.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def timed_request(client, case) -> dict:
+    """Один запрос в откатываемой транзакции."""
+    timer = QueryTimer()
+    with transaction.atomic():
+        with connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            response = getattr(client, case.method)(case.path, case.data)
+            elapsed = time.perf_counter() - started
+        transaction.set_rollback(True)
+    if response.status_code >= 400:
+        raise BenchmarkError(f'{case.path}: ответ {response.status_code}')
+    return {
+        'ms': elapsed * 1000,
+        'queries': timer.count,
+        'sql_ms': timer.seconds * 1000,
+        'bytes': len(response.content),
+    }
+
+
+def measure(client, user, case, repeat) -> dict:
+    cache.clear()
+    runs = []
+    for _ in range(repeat + 1):
+        if case.fresh_login:
+            client.force_login(user)
+        runs.append(timed_request(client, case))
+    if case.fresh_login:
+        client.force_login(user)
+    cold, warm = runs[0], runs[1:] or runs
+    timings = [run['ms'] for run in warm]
+    return {
+        'cold_queries': cold['queries'],
+        'queries': max(run['queries'] for run in warm),
+        'sql_ms': round(statistics.median(run['sql_ms'] for run in warm), 2),
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'bytes': warm[-1]['bytes'],
+    }
+
+
+def run_benchmark(repeat=20, names=None) -> dict:
+    """Замеры всех URL; names ограничивает список представлений."""
+    user = pick_user()
+    client = Client()
+    client.force_login(user)
+    return {
+        name: measure(client, user, case, repeat)
+        for name, case in make_cases(user).items()
+        if names is None or name in names
+    }
+
+
+def load_budget(path) -> dict:
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_budget(path, budget) -> None:
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(budget, file, ensure_ascii=False, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def check_budget(results, budget, tolerance=None, metrics=METRICS) -> list:
+    """Нарушения бюджета: список строк, пустой, если все в порядке.
+
+    metrics ограничивает проверяемые показатели: например, время на
+    другой машине несопоставимо с записанным в бюджете.
+    """
+    if tolerance is None:
+        tolerance = budget.get('tolerance', DEFAULT_TOLERANCE)
+    views = budget['views']
+    errors = [
+        f'{name}: нет в бюджете' for name in results if name not in views
+    ]
+    for name, expected in views.items():
+        actual = results.get(name)
+        if actual is None:
+            errors.append(f'{name}: не замерено')
+            continue
+        for metric in metrics:
+            limit = expected[metric]
+            if metric not in QUERY_METRICS:
+                limit *= 1 + tolerance
+            if metric in TIMING_METRICS:
+                limit += TIMING_SLACK_MS
+            if actual[metric] > limit:
+                errors.append(
+                    f'{name}: {metric} {actual[metric]} > {limit:g}'
+                )
+    return errors
@@ -0,0 +1,133 @@
+import asyncio
+import time
+from functools import wraps
+from hashlib import md5
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core.holes import render_holes
+
+VERSION_KEY_PREFIX = 'cache_version'
+# Область всех страниц: повышается командами, меняющими данные массово
+SITE_SCOPE = 'site'
+
+
+def get_versions(scopes) -> list:
+    """Возвращает текущие версии областей кэша.
+
+    Отсутствующая версия создается из текущего времени, чтобы после
+    вытеснения ключа из кэша не совпасть со старыми записями.
+    """
+    keys = [f'{VERSION_KEY_PREFIX}:{scope}' for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(scopes) -> list:
+    """Асинхронная версия get_versions."""
+    keys = [f'{VERSION_KEY_PREFIX}:{scope}' for scope in scopes]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*scopes) -> None:
+    """Делает устаревшими все страницы, зависящие от областей."""
+    for scope in scopes:
+        key = f'{VERSION_KEY_PREFIX}:{scope}'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def page_cache_key(key_prefix, versions, request) -> str:
+    path = md5(request.get_full_path().encode()).hexdigest()
+    return ':'.join(map(str, (key_prefix, *versions, path)))
+
+
+def cache_shared_page(key_prefix, *scopes):
+    """Кэширует одну общую для всех посетителей версию страницы.
+
+    Пользовательские фрагменты страницы выводятся тегом ``{% hole %}``
+    и рендерятся заново при каждом запросе, поэтому кэш работает и для
+    авторизованных пользователей.
+
+    Ключ включает версии областей ``scopes`` (шаблоны строк с
+    аргументами URL, например ``'group:{slug}'``) и ``SITE_SCOPE``.
+    Сигналы моделей повышают версии через ``bump_versions``, и
+    страница обновляется сразу после изменения данных.
+
+    Асинхронные представления получают асинхронную обертку, которая
+    обращается к кэшу через aget/aset.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            return async_cache_shared_page(view, key_prefix, scopes)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            key = page_cache_key(key_prefix, get_versions(
+                [SITE_SCOPE, *(scope.format(**kwargs) for scope in scopes)]
+            ), request)
+            content = cache.get(key)
+            if content is not None:
+                return HttpResponse(render_holes(request, content))
+            request.punch_holes = True
+            try:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render'):
+                    response.render()
+            finally:
+                request.punch_holes = False
+            if response.status_code != 200 or response.streaming:
+                return response
+            content = response.content.decode(response.charset)
+            cache.set(key, content, settings.CACHE_TIMEOUT_LISTVIEW)
+            response.content = render_holes(request, content)
+            return response
+        return wrapper
+    return decorator
+
+
+def async_cache_shared_page(view, key_prefix, scopes):
+    """Асинхронный вариант обертки cache_shared_page.
+
+    Представление должно вернуть уже отрендеренный ответ.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await view(request, *args, **kwargs)
+        key = page_cache_key(key_prefix, await aget_versions(
+            [SITE_SCOPE, *(scope.format(**kwargs) for scope in scopes)]
+        ), request)
+        content = await cache.aget(key)
+        if content is not None:
+            return HttpResponse(
+                await sync_to_async(render_holes)(request, content)
+            )
+        request.punch_holes = True
+        try:
+            response = await view(request, *args, **kwargs)
+        finally:
+            request.punch_holes = False
+        if response.status_code != 200 or response.streaming:
+            return response
+        content = response.content.decode(response.charset)
+        await cache.aset(key, content, settings.CACHE_TIMEOUT_LISTVIEW)
+        response.content = await sync_to_async(render_holes)(request, content)
+        return response
+    return wrapper
@@ -0,0 +1,321 @@
+"""Кэш в файле, отображенном в память, общий для всех процессов хоста.
+
+Файл разбит на слоты фиксированного размера. Ключ попадает в окно из
+PROBE_LIMIT соседних слотов, выбранное по хешу ключа. Если в окне нет
+свободного места, вытесняется слот, к которому дольше всего не было
+обращений (приближенный LRU, как выборочный LRU в Redis). Доступ
+синхронизирован блокировкой потока и flock на файле, поэтому incr и
+add атомарны между воркерами.
+
+Значение вместе с ключом должно поместиться в один слот. Более крупные
+значения не сохраняются: такие пропуски считаются в заголовке файла
+(oversized_skips), а первый пропуск в процессе выдает предупреждение
+CacheValueTooLarge. Файл создается разреженным, и память занимают
+только записанные части слотов, поэтому SLOT_SIZE выбирается по
+самой большой странице, а не по средней записи.
+
+Пример настройки::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.SharedMemoryCache',
+            'LOCATION': '/dev/shm/yatube_cache',
+            'OPTIONS': {'MAX_ENTRIES': 1024, 'SLOT_SIZE': 512 * 1024},
+        }
+    }
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MAGIC = b'YTCACHE1'
+FILE_HEADER = struct.Struct('<8sIIQ')
+FILE_HEADER_SIZE = 64
+# состояние, хеш ключа, срок жизни, отметка доступа, длины ключа и значения
+SLOT_HEADER = struct.Struct('<BQdQHI')
+CLOCK_OFFSET = 16
+SKIPS_OFFSET = 24
+FREE = 0
+USED = 1
+PROBE_LIMIT = 8
+DEFAULT_SLOT_SIZE = 128 * 1024
+UNPICKLING_ERRORS = (
+    pickle.UnpicklingError, EOFError, AttributeError, ImportError,
+    IndexError, KeyError, TypeError, ValueError,
+)
+
+
+class CacheValueTooLarge(RuntimeWarning):
+    pass
+
+
+class SharedMemoryCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._slots = self._max_entries
+        self._slot_size = int(options.get('SLOT_SIZE', DEFAULT_SLOT_SIZE))
+        self._size = FILE_HEADER_SIZE + self._slots * self._slot_size
+        self._thread_lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._warned = False
+
+    @property
+    def max_value_size(self):
+        return self._slot_size - SLOT_HEADER.size
+
+    @property
+    def oversized_skips(self):
+        """Сколько значений не поместилось в слот во всех процессах."""
+        with self._locked():
+            return struct.unpack_from('<Q', self._map, SKIPS_OFFSET)[0]
+
+    def _open(self):
+        """Открывает файл заново в каждом процессе.
+
+        flock привязан к открытому файлу, и дескриптор, унаследованный
+        после fork, не разделял бы воркеры между собой.
+        """
+        if self._pid == os.getpid():
+            return
+        if self._map is not None:
+            self._map.close()
+            os.close(self._fd)
+        os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != self._size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self._size)
+            self._map = mmap.mmap(fd, self._size)
+            magic, slots, slot_size, _ = FILE_HEADER.unpack_from(self._map)
+            if (magic, slots, slot_size) != (
+                MAGIC, self._slots, self._slot_size
+            ):
+                self._map[:FILE_HEADER_SIZE] = bytes(FILE_HEADER_SIZE)
+                FILE_HEADER.pack_into(
+                    self._map, 0, MAGIC, self._slots, self._slot_size, 0
+                )
+                self._clear()
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd = fd
+        self._pid = os.getpid()
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _tick(self):
+        clock = struct.unpack_from('<Q', self._map, CLOCK_OFFSET)[0] + 1
+        struct.pack_into('<Q', self._map, CLOCK_OFFSET, clock)
+        return clock
+
+    def _offset(self, index):
+        return FILE_HEADER_SIZE + index * self._slot_size
+
+    def _window(self, key_hash):
+        start = key_hash % self._slots
+        for step in range(min(PROBE_LIMIT, self._slots)):
+            yield (start + step) % self._slots
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little')
+
+    def _find(self, key):
+        """Возвращает номер живого слота с ключом или None."""
+        key_hash = self._hash(key)
+        encoded = key.encode()
+        now = time.time()
+        for index in self._window(key_hash):
+            offset = self._offset(index)
+            state, slot_hash, expires, _, key_len, _ = (
+                SLOT_HEADER.unpack_from(self._map, offset)
+            )
+            if state != USED or slot_hash != key_hash:
+                continue
+            start = offset + SLOT_HEADER.size
+            if self._map[start:start + key_len] != encoded:
+                continue
+            if expires and expires <= now:
+                self._map[offset] = FREE
+                return None
+            return index
+        return None
+
+    def _read(self, index):
+        offset = self._offset(index)
+        state, key_hash, expires, _, key_len, value_len = (
+            SLOT_HEADER.unpack_from(self._map, offset)
+        )
+        SLOT_HEADER.pack_into(
+            self._map, offset, state, key_hash, expires, self._tick(),
+            key_len, value_len
+        )
+        start = offset + SLOT_HEADER.size + key_len
+        return self._map[start:start + value_len]
+
+    def _write(self, key, pickled, expires, index=None):
+        encoded = key.encode()
+        if len(encoded) + len(pickled) > self.max_value_size:
+            if index is not None:
+                self._map[self._offset(index)] = FREE
+            self._skip_oversized(key, len(encoded) + len(pickled))
+            return False
+        key_hash = self._hash(key)
+        if index is None:
+            index = self._choose_slot(key_hash)
+        offset = self._offset(index)
+        start = offset + SLOT_HEADER.size
+        self._map[start:start + len(encoded)] = encoded
+        start += len(encoded)
+        self._map[start:start + len(pickled)] = pickled
+        SLOT_HEADER.pack_into(
+            self._map, offset, USED, key_hash, expires or 0, self._tick(),
+            len(encoded), len(pickled)
+        )
+        return True
+
+    def _skip_oversized(self, key, size):
+        skips = struct.unpack_from('<Q', self._map, SKIPS_OFFSET)[0] + 1
+        struct.pack_into('<Q', self._map, SKIPS_OFFSET, skips)
+        if not self._warned:
+            self._warned = True
+            warnings.warn(
+                f'Значение {key} ({size} байт) больше слота кэша '
+                f'({self.max_value_size} байт) и не сохранено; '
+                'увеличьте SLOT_SIZE',
+                CacheValueTooLarge, stacklevel=2
+            )
+
+    def _choose_slot(self, key_hash):
+        """Свободный или просроченный слот окна, иначе самый старый."""
+        now = time.time()
+        oldest, oldest_access = None, None
+        for index in self._window(key_hash):
+            state, _, expires, access, _, _ = SLOT_HEADER.unpack_from(
+                self._map, self._offset(index)
+            )
+            if state != USED or (expires and expires <= now):
+                return index
+            if oldest is None or access < oldest_access:
+                oldest, oldest_access = index, access
+        return oldest
+
+    def _clear(self):
+        for index in range(self._slots):
+            self._map[self._offset(index)] = FREE
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._locked():
+            if self._find(key) is not None:
+                return False
+            return self._write(key, pickled, self.get_backend_timeout(timeout))
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._locked():
+            index = self._find(key)
+            if index is None:
+                return default
+            pickled = self._read(index)
+        try:
+            return pickle.loads(pickled)
+        except UNPICKLING_ERRORS:
+            self._discard(key, pickled)
+            return default
+
+    def _discard(self, key, pickled):
+        """Освобождает слот с поврежденным значением.
+
+        Слот освобождается, только если его не перезаписали после
+        чтения.
+        """
+        with self._locked():
+            index = self._find(key)
+            if index is not None and self._read(index) == pickled:
+                self._map[self._offset(index)] = FREE
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._locked():
+            self._write(
+                key, pickled, self.get_backend_timeout(timeout),
+                self._find(key)
+            )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._locked():
+            index = self._find(key)
+            if index is None:
+                return False
+            offset = self._offset(index)
+            fields = list(SLOT_HEADER.unpack_from(self._map, offset))
+            fields[2] = self.get_backend_timeout(timeout) or 0
+            SLOT_HEADER.pack_into(self._map, offset, *fields)
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._locked():
+            index = self._find(key)
+            if index is None:
+                raise ValueError("Key '%s' not found" % key)
+            try:
+                value = pickle.loads(self._read(index))
+            except UNPICKLING_ERRORS:
+                self._map[self._offset(index)] = FREE
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            expires = SLOT_HEADER.unpack_from(
+                self._map, self._offset(index)
+            )[2]
+            self._write(
+                key, pickle.dumps(value, self.pickle_protocol), expires, index
+            )
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._locked():
+            return self._find(key) is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._locked():
+            index = self._find(key)
+            if index is None:
+                return False
+            self._map[self._offset(index)] = FREE
+            return True
+
+    def clear(self):
+        with self._locked():
+            self._clear()
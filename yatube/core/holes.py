@@ -0,0 +1,52 @@
+"""Пользовательские фрагменты ("дыры") в общих закэшированных страницах.
+
+Страница кэшируется один раз в виде, одинаковом для всех посетителей.
+Вместо пользовательских фрагментов в ней остаются подписанные метки,
+которые при каждом запросе заменяются отрендеренными фрагментами.
+"""
+import re
+
+from django.core import signing
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+HOLE_SALT = 'core.holes'
+HOLE_RE = re.compile(r'<!--hole:([\w:-]+)-->')
+
+HOLES = {}
+
+
+def register_hole(name, template_name):
+    """Регистрирует фрагмент и функцию, собирающую его контекст."""
+    def decorator(get_context):
+        HOLES[name] = (template_name, get_context)
+        return get_context
+    return decorator
+
+
+def render_hole(request, name, params):
+    template_name, get_context = HOLES[name]
+    return render_to_string(
+        template_name, get_context(request, **params), request=request
+    )
+
+
+def hole_placeholder(name, params):
+    token = signing.dumps([name, params], salt=HOLE_SALT, compress=True)
+    return mark_safe(f'<!--hole:{token}-->')
+
+
+def render_holes(request, content):
+    """Заменяет метки в закэшированной странице фрагментами запроса."""
+    def replace(match):
+        try:
+            name, params = signing.loads(match.group(1), salt=HOLE_SALT)
+        except signing.BadSignature:
+            return ''
+        return render_hole(request, name, params)
+    return HOLE_RE.sub(replace, content)
+
+
+@register_hole('header', 'includes/header.html')
+def header_context(request):
+    return {}
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+CLIENT_ADDRESS = '192.0.2.1'
+
+
+class SlowCache(LocMemCache):
+    """LocMemCache с задержкой чтения, как у кэша по сети.
+
+    Синхронные get и get_many блокируют поток на ``DELAY`` секунд;
+    асинхронные версии BaseCache выполняют их в пуле потоков и не
+    блокируют цикл событий.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.delay = float(params.get('OPTIONS', {}).get('DELAY', 0))
+
+    def get(self, *args, **kwargs):
+        time.sleep(self.delay)
+        return super().get(*args, **kwargs)
+
+    def get_many(self, *args, **kwargs):
+        time.sleep(self.delay)
+        return super().get_many(*args, **kwargs)
+
+
+def asgi_scope(path):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver')],
+        'client': (CLIENT_ADDRESS, 0),
+        'server': ('testserver', 80),
+    }
+
+
+async def asgi_get(application, path):
+    status = None
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(asgi_scope(path), receive, send)
+    return status
+
+
+def run_wsgi(path, requests, threads):
+    def get(_):
+        started = time.perf_counter()
+        response = Client(REMOTE_ADDR=CLIENT_ADDRESS).get(path)
+        return response.status_code, time.perf_counter() - started
+
+    get(None)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(get, range(requests)))
+    return results, time.perf_counter() - started
+
+
+def run_asgi(path, requests):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+
+    async def get():
+        started = time.perf_counter()
+        status = await asgi_get(application, path)
+        return status, time.perf_counter() - started
+
+    async def run():
+        await get()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(get() for _ in range(requests)))
+        return results, time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность WSGI и ASGI на страницах '
+            'ленты при медленном кэше')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument(
+            '--delay', type=float, default=0.02,
+            help='Задержка одного чтения из кэша, секунды'
+        )
+        parser.add_argument(
+            '--wsgi-threads', type=int, default=1,
+            help='Потоков у WSGI-воркера'
+        )
+        parser.add_argument(
+            '--no-page-cache', action='store_true',
+            help='Отключить кэш страниц и мерить сами представления'
+        )
+        parser.add_argument(
+            '--worker', choices=('wsgi', 'asgi'), help='Служебный режим'
+        )
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self.handle_worker(options)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{options["requests"]} запросов к {options["path"]}, '
+            f'задержка кэша {options["delay"] * 1000:.0f} мс'
+        ))
+        self.stdout.write(
+            f'{"mode":<10}{"status":>8}{"req/s":>10}{"mean, ms":>10}'
+        )
+        for mode in ('wsgi', 'asgi'):
+            result = self.spawn_worker(mode, options)
+            self.stdout.write(
+                f'{mode:<10}{result["status"]:>8}'
+                f'{result["requests"] / result["elapsed"]:>10.1f}'
+                f'{result["mean"] * 1000:>10.1f}'
+            )
+
+    def spawn_worker(self, mode, options):
+        """Запускает режим в отдельном процессе.
+
+        Выбор синхронных или асинхронных представлений происходит при
+        импорте URL, поэтому режимы нельзя сравнить в одном процессе.
+        """
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'),
+            'bench_asgi', '--worker', mode,
+            '--path', options['path'],
+            '--requests', str(options['requests']),
+            '--delay', str(options['delay']),
+            '--wsgi-threads', str(options['wsgi_threads']),
+        ]
+        if options['no_page_cache']:
+            command.append('--no-page-cache')
+        env = dict(os.environ, ASYNC_VIEWS='1' if mode == 'asgi' else '0')
+        output = subprocess.run(
+            command, env=env, check=True, capture_output=True, text=True
+        ).stdout
+        return json.loads(output.splitlines()[-1])
+
+    def handle_worker(self, options):
+        caches = {'default': {
+            'BACKEND': f'{__name__}.SlowCache',
+            'OPTIONS': {'DELAY': options['delay'], 'MAX_ENTRIES': 10000},
+        }}
+        page_timeout = (0 if options['no_page_cache']
+                        else settings.CACHE_TIMEOUT_LISTVIEW)
+        with override_settings(
+            CACHES=caches, CACHE_TIMEOUT_LISTVIEW=page_timeout
+        ):
+            if options['worker'] == 'asgi':
+                results, elapsed = run_asgi(
+                    options['path'], options['requests']
+                )
+            else:
+                results, elapsed = run_wsgi(
+                    options['path'], options['requests'],
+                    options['wsgi_threads']
+                )
+        statuses = {status for status, _ in results}
+        self.stdout.write(json.dumps({
+            'status': ','.join(map(str, sorted(statuses))),
+            'requests': len(results),
+            'elapsed': elapsed,
+            'mean': sum(seconds for _, seconds in results) / len(results),
+        }))
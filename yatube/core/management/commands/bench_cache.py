@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends import SharedMemoryCache
+
+
+def make_backends(directory, entries):
+    options = {'OPTIONS': {
+        'MAX_ENTRIES': entries, 'SLOT_SIZE': settings.CACHE_SLOT_SIZE
+    }}
+    return {
+        'locmem': LocMemCache('bench', options),
+        'filebased': FileBasedCache(
+            os.path.join(directory, 'filebased'), options
+        ),
+        'shared': SharedMemoryCache(
+            os.path.join(directory, 'shared'), options
+        ),
+    }
+
+
+def run_worker(backend, worker, workers, keys, barrier, results):
+    """Пишет свои ключи и читает ключи всех воркеров."""
+    value = 'x' * 1024
+    for number in range(keys):
+        backend.set(f'{worker}:{number}', value)
+    barrier.wait()
+    hits = 0
+    started = time.perf_counter()
+    for other in range(workers):
+        for number in range(keys):
+            hits += backend.get(f'{other}:{number}') is not None
+    results.put((hits, time.perf_counter() - started))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает SharedMemoryCache с LocMemCache и FileBasedCache: '
+            'скорость операций и общие попадания между процессами')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=2000)
+        parser.add_argument('--value-size', type=int, default=16 * 1024)
+        parser.add_argument('--workers', type=int, default=4)
+
+    def measure(self, function, operations):
+        started = time.perf_counter()
+        for number in range(operations):
+            function(number)
+        return operations / (time.perf_counter() - started)
+
+    def bench_operations(self, backends, operations, value_size):
+        value = 'x' * value_size
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Операций в секунду (значение {value_size} байт)'
+        ))
+        self.stdout.write(f'{"backend":<10}{"set":>12}{"get":>12}{"incr":>12}')
+        for name, backend in backends.items():
+            backend.clear()
+            backend.set('counter', 0)
+            rates = (
+                self.measure(
+                    lambda n: backend.set(f'key:{n}', value), operations
+                ),
+                self.measure(lambda n: backend.get(f'key:{n}'), operations),
+                self.measure(lambda n: backend.incr('counter'), operations),
+            )
+            self.stdout.write(
+                f'{name:<10}' + ''.join(f'{rate:>12.0f}' for rate in rates)
+            )
+
+    def bench_workers(self, backends, workers, keys):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Попадания между {workers} процессами'
+        ))
+        self.stdout.write(f'{"backend":<10}{"hit rate":>12}{"get/s":>12}')
+        context = multiprocessing.get_context('fork')
+        for name, backend in backends.items():
+            backend.clear()
+            barrier = context.Barrier(workers)
+            results = context.Queue()
+            processes = [
+                context.Process(target=run_worker, args=(
+                    backend, worker, workers, keys, barrier, results
+                )) for worker in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            measured = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            reads = workers * workers * keys
+            hits = sum(hits for hits, _ in measured)
+            elapsed = sum(seconds for _, seconds in measured)
+            self.stdout.write(
+                f'{name:<10}{hits / reads:>12.2f}'
+                f'{reads / elapsed * workers:>12.0f}'
+            )
+
+    def handle(self, *args, **options):
+        operations = options['operations']
+        with tempfile.TemporaryDirectory() as directory:
+            backends = make_backends(directory, operations * 2)
+            self.bench_operations(
+                backends, operations, options['value_size']
+            )
+            keys = min(operations // options['workers'], 200)
+            self.bench_workers(backends, options['workers'], keys)
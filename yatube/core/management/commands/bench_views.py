@@ -0,0 +1,135 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from core.benchmark import (DEFAULT_TOLERANCE, METRICS, QUERY_METRICS,
+                            BenchmarkError, check_budget, load_budget,
+                            run_benchmark, save_budget)
+
+DEFAULT_DATASET = {
+    'seed': 1, 'users': 1000, 'groups': 30, 'posts': 20000,
+    'comments': 60000, 'follows_per_user': 15,
+}
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время, SQL-запросы и размер ответа всех страниц '
+            'posts, about и users на синтетических данных и сверяет их '
+            'с бюджетом VIEW_BUDGET_FILE')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--budget', default=settings.VIEW_BUDGET_FILE)
+        parser.add_argument(
+            '--tolerance', type=float,
+            help='Допустимый рост времени и размера ответа, доля'
+        )
+        parser.add_argument(
+            '--queries-only', action='store_true',
+            help='Проверять только число SQL-запросов'
+        )
+        parser.add_argument(
+            '--from-snapshot', metavar='PATH',
+            help='Взять данные из снимка seed_benchmark_data'
+        )
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Записать результаты как новый бюджет'
+        )
+        parser.add_argument('views', nargs='*', help='Только эти URL')
+
+    def handle(self, *args, **options):
+        try:
+            budget = load_budget(options['budget'])
+        except FileNotFoundError:
+            if not options['update']:
+                raise CommandError(
+                    f'Нет файла бюджета {options["budget"]}, '
+                    'создайте его с --update'
+                )
+            budget = {'dataset': DEFAULT_DATASET,
+                      'tolerance': DEFAULT_TOLERANCE, 'views': {}}
+        try:
+            results = self.run_isolated(budget['dataset'], options)
+        except BenchmarkError as error:
+            raise CommandError(error)
+        self.write_table(results)
+        if options['update']:
+            budget['views'].update(results)
+            save_budget(options['budget'], budget)
+            self.stdout.write(self.style.SUCCESS(
+                f'Бюджет записан в {options["budget"]}'
+            ))
+            return
+        if options['views']:
+            budget['views'] = {
+                name: budget['views'][name]
+                for name in options['views'] if name in budget['views']
+            }
+        errors = check_budget(
+            results, budget, options['tolerance'],
+            QUERY_METRICS if options['queries_only'] else METRICS
+        )
+        if errors:
+            raise CommandError(
+                'Бюджет превышен:\n' + '\n'.join(errors)
+            )
+        self.stdout.write(self.style.SUCCESS('Бюджет соблюден'))
+
+    def run_isolated(self, dataset, options):
+        """Замеры в отдельной тестовой базе, кэше и каталоге медиа.
+
+        Рабочая база и кэш не меняются: данные создаются заново или
+        загружаются из снимка.
+        """
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                caches = {'default': {
+                    **settings.CACHES['default'],
+                    'LOCATION': os.path.join(directory, 'cache'),
+                }}
+                with override_settings(
+                    CACHES=caches, MEDIA_ROOT=os.path.join(directory, 'media')
+                ):
+                    self.load_dataset(dataset, options['from_snapshot'])
+                    return run_benchmark(
+                        options['repeat'], options['views'] or None
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def load_dataset(self, dataset, snapshot):
+        output = StringIO()
+        if snapshot:
+            call_command('seed_benchmark_data', from_snapshot=snapshot,
+                         stdout=output)
+        else:
+            self.stdout.write('Генерация данных: ' + ', '.join(
+                f'{key}={value}' for key, value in dataset.items()
+            ))
+            call_command('seed_benchmark_data', **dataset, stdout=output)
+
+    def write_table(self, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{"view":<32}{"cold q":>8}{"q":>5}{"sql ms":>9}'
+            f'{"p50 ms":>9}{"p95 ms":>9}{"bytes":>9}'
+        ))
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<32}{result["cold_queries"]:>8}{result["queries"]:>5}'
+                f'{result["sql_ms"]:>9.2f}{result["p50_ms"]:>9.2f}'
+                f'{result["p95_ms"]:>9.2f}{result["bytes"]:>9}'
+            )
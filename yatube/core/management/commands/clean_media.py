@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.media import delete_orphans, find_orphans
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы MEDIA_ROOT, на которые не ссылаются модели, '
+            'тексты постов и kvstore миниатюр')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, какие файлы будут удалены'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--min-age', type=float, default=24,
+            help='Не трогать файлы моложе указанного числа часов'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Повторять очистку в фоне'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=24,
+            help='Пауза между очистками в режиме --loop, часы'
+        )
+
+    def clean(self, options):
+        orphans = find_orphans(options['min_age'] * 60 * 60)
+        total = sum(size for _, size in orphans)
+        if options['dry_run']:
+            for name, size in orphans:
+                self.stdout.write(f'{size:>12} {name}')
+            self.stdout.write(
+                f'Будет удалено файлов: {len(orphans)}, байт: {total}'
+            )
+            return
+        deleted = 0
+        for count, size in delete_orphans(orphans, options['batch_size']):
+            deleted += count
+            self.stdout.write(f'Удалено файлов: {count}, байт: {size}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего удалено файлов: {deleted}, байт: {total}'
+        ))
+
+    def handle(self, *args, **options):
+        while True:
+            self.clean(options)
+            if not options['loop']:
+                return
+            time.sleep(options['interval'] * 60 * 60)
@@ -0,0 +1,52 @@
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.models import ThumbnailJob
+from core.thumbnails import enqueue_thumbnails, generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Фоновый воркер: создает миниатюры из очереди ThumbnailJob'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Поставить в очередь все изображения без миниатюр'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а ждать новых заданий'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2,
+            help='Пауза между проверками очереди в режиме --loop, секунды'
+        )
+
+    def enqueue_all(self):
+        for field in settings.THUMBNAIL_PRESETS:
+            app_label, model_name, field_name = field.split('.')
+            model = apps.get_model(app_label, model_name)
+            for instance in model.objects.exclude(
+                **{field_name: ''}
+            ).only(field_name).iterator():
+                enqueue_thumbnails(getattr(instance, field_name), field)
+
+    def process_queue(self):
+        done = 0
+        for job in ThumbnailJob.objects.all():
+            done += generate_thumbnails(job)
+        return done
+
+    def handle(self, *args, **options):
+        if options['all']:
+            self.enqueue_all()
+        while True:
+            done = self.process_queue()
+            if done:
+                self.stdout.write(f'Обработано изображений: {done}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,417 @@
+"""Синтетические данные для замеров производительности.
+
+Данные детерминированы: при одном --seed и одних параметрах получается
+одна и та же база. Распределения неравномерные, как на живом сайте:
+размеры групп и активность авторов подчиняются закону Ципфа, число
+комментариев к посту — распределению Парето, подписки чаще ведут к
+популярным авторам.
+
+Строки пишутся через bulk_create, поэтому сигналы не срабатывают.
+Поля и таблицы, которые заполняют сигналы (анонс, очищенный HTML,
+счетчики, ленты подписок, поисковый индекс), команда заполняет сама.
+"""
+import io
+import random
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from faker import Faker
+from PIL import Image
+
+from about.models import About, Tech
+from core.cache import SITE_SCOPE, bump_versions
+from core.models import ThumbnailJob
+from core.sanitizer import compile_html
+from posts.counters import reconcile_posts_counters
+from posts.excerpts import make_excerpt
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.timeline import trim_timelines
+
+User = get_user_model()
+
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+PASSWORD = 'benchmark'
+IMAGE_FIELD = 'posts.Post.image'
+IMAGE_SHARE = 0.3
+VIDEO_SHARE = 0.05
+INLINE_IMAGE_SHARE = 0.1
+COMMENTS_ALPHA = 1.2
+AUTHORS_ALPHA = 1.1
+GROUPS_ALPHA = 1.0
+FOLLOW_ALPHA = 0.8
+TECH_COUNT = 10
+
+
+def zipf_weights(count: int, alpha: float) -> list:
+    return [1 / rank ** alpha for rank in range(1, count + 1)]
+
+
+class Command(BaseCommand):
+    help = ('Заполняет пустую базу детерминированными синтетическими '
+            'данными для замеров и при необходимости сохраняет снимок '
+            'в файл SQLite')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=30)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=60000)
+        parser.add_argument('--follows-per-user', type=int, default=15)
+        parser.add_argument(
+            '--images', type=int, default=0,
+            help='Сколько разных картинок создать для постов'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты записей'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--snapshot', metavar='PATH',
+            help='Сохранить получившуюся базу в файл SQLite'
+        )
+        parser.add_argument(
+            '--from-snapshot', metavar='PATH',
+            help='Загрузить базу из снимка вместо генерации'
+        )
+
+    def handle(self, *args, **options):
+        if options['from_snapshot']:
+            self.restore(options['from_snapshot'])
+            return
+        if Post.objects.exists():
+            raise CommandError(
+                'В базе уже есть записи: данные генерируются в пустую базу'
+            )
+        if options['users'] < 2 or options['posts'] < 1:
+            raise CommandError('Нужно хотя бы два пользователя и одна запись')
+        self.batch_size = options['batch_size']
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            groups = self.create_groups(options['groups'])
+            images = self.create_images(options['images'])
+            posts = self.create_posts(
+                options['posts'], users, groups, images, options['days']
+            )
+            comments = self.create_comments(options['comments'], users, posts)
+            follows = self.create_follows(users, options['follows_per_user'])
+            self.create_about(users)
+            reconcile_posts_counters()
+            timeline = self.fill_timelines(users)
+        indexed = self.rebuild_search_index()
+        bump_versions(SITE_SCOPE, 'feeds')
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {len(users)}, групп: {len(groups)}, '
+            f'записей: {len(posts)}, комментариев: {comments}, '
+            f'подписок: {follows}, записей в лентах: {timeline}, '
+            f'картинок: {len(images)}, документов в индексе: {indexed}'
+        ))
+        if options['snapshot']:
+            self.snapshot(options['snapshot'])
+
+    def weighted_sample(self, population, cum_weights, count):
+        """count элементов population с весами, пачками по batch_size."""
+        while count > 0:
+            size = min(count, self.batch_size)
+            yield from self.rng.choices(
+                population, cum_weights=cum_weights, k=size
+            )
+            count -= size
+
+    def bulk_create(self, model, objects, **kwargs):
+        model.objects.bulk_create(
+            objects, batch_size=self.batch_size, **kwargs
+        )
+
+    def set_dates(self, model, dates, fields=('created',)):
+        """Проставляет даты после bulk_create: auto_now их перезаписывает.
+
+        dates — список дат по возрастанию первичного ключа.
+        """
+        objects = model.objects.order_by('pk').only('pk')
+        for obj, date in zip(objects.iterator(chunk_size=self.batch_size),
+                             dates):
+            for field in fields:
+                setattr(obj, field, date)
+            yield obj
+
+    def bulk_update_dates(self, model, dates, fields=('created',)):
+        batch = []
+        for obj in self.set_dates(model, dates, fields):
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_update(batch, fields)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, fields)
+
+    def new_pks(self, model, objects) -> list:
+        """Создает объекты и возвращает их первичные ключи по порядку."""
+        last_pk = model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        self.bulk_create(model, objects)
+        return list(model.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+    def create_users(self, count: int) -> list:
+        password = make_password(PASSWORD, salt='benchmark')
+        users = []
+        for number in range(count):
+            profile = self.fake.simple_profile()
+            first_name, _, last_name = profile['name'].partition(' ')
+            users.append(User(
+                username=f'{profile["username"]}_{number}'[:150],
+                first_name=first_name[:150],
+                last_name=last_name[:150],
+                email=profile['mail'],
+                password=password,
+                date_joined=START - timedelta(days=self.rng.randint(1, 365)),
+            ))
+        return self.new_pks(User, users)
+
+    def create_groups(self, count: int) -> list:
+        groups = [
+            Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f'group-{number}',
+                description=self.fake.paragraph(nb_sentences=3),
+            )
+            for number in range(count)
+        ]
+        return self.new_pks(Group, groups)
+
+    def make_image(self) -> bytes:
+        width = self.rng.choice((640, 800, 1024))
+        height = width * 3 // 4
+        image = Image.new('RGB', (width, height), tuple(
+            self.rng.randrange(256) for _ in range(3)
+        ))
+        stripe = tuple(self.rng.randrange(256) for _ in range(3))
+        for row in range(0, height, self.rng.randint(8, 64)):
+            image.paste(stripe, (0, row, width, row + 4))
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=85)
+        return buffer.getvalue()
+
+    def create_images(self, count: int) -> list:
+        names = [
+            default_storage.save('posts/benchmark.jpg',
+                                 ContentFile(self.make_image()))
+            for _ in range(count)
+        ]
+        self.bulk_create(ThumbnailJob, [
+            ThumbnailJob(source=name, field=IMAGE_FIELD) for name in names
+        ], ignore_conflicts=True)
+        return names
+
+    def make_html(self) -> str:
+        """Текст поста в разметке, похожей на вывод CKEditor."""
+        paragraphs = []
+        for _ in range(max(1, int(self.rng.lognormvariate(1.0, 0.7)))):
+            words = self.fake.paragraph(
+                nb_sentences=self.rng.randint(2, 8)
+            ).split()
+            position = self.rng.randrange(len(words))
+            tag = self.rng.choice(('b', 'i', 'strong', 'em'))
+            words[position] = f'<{tag}>{words[position]}</{tag}>'
+            if self.rng.random() < 0.2:
+                position = self.rng.randrange(len(words))
+                words[position] = (
+                    f'<a href="{self.fake.url()}">{words[position]}</a>'
+                )
+            paragraphs.append(f'<p>{" ".join(words)}</p>')
+        if self.rng.random() < INLINE_IMAGE_SHARE:
+            paragraphs.insert(self.rng.randrange(len(paragraphs) + 1), (
+                f'<p><img alt="" src="/media/uploads/benchmark/'
+                f'{self.rng.randrange(1000)}.jpg" style="width: 640px">'
+                f'</p>'
+            ))
+        if self.rng.random() < VIDEO_SHARE:
+            video_id = ''.join(self.rng.choices(
+                'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_-', k=11
+            ))
+            paragraphs.append(
+                '<iframe width="640" height="360" frameborder="0" '
+                f'src="https://www.youtube.com/embed/{video_id}" '
+                'allowfullscreen></iframe>'
+            )
+        return '\n'.join(paragraphs)
+
+    def make_dates(self, count: int, days: int) -> list:
+        step = timedelta(days=days) / count
+        return [
+            START + step * number
+            + timedelta(seconds=self.rng.randrange(int(step.total_seconds())
+                                                   or 1))
+            for number in range(count)
+        ]
+
+    def create_posts(self, count, users, groups, images, days) -> list:
+        authors = list(accumulate(zipf_weights(len(users), AUTHORS_ALPHA)))
+        shuffled = users[:]
+        self.rng.shuffle(shuffled)
+        group_weights = list(accumulate(zipf_weights(len(groups),
+                                                     GROUPS_ALPHA)))
+        created = 0
+        author_ids = self.weighted_sample(shuffled, authors, count)
+        while created < count:
+            batch = []
+            for _ in range(min(self.batch_size, count - created)):
+                text = self.make_html()
+                group = None
+                if groups and self.rng.random() < 0.7:
+                    group = self.rng.choices(
+                        groups, cum_weights=group_weights
+                    )[0]
+                image = ''
+                if images and self.rng.random() < IMAGE_SHARE:
+                    image = self.rng.choice(images)
+                batch.append(Post(
+                    text=text,
+                    text_html=compile_html(text),
+                    author_id=next(author_ids),
+                    group_id=group,
+                    image=image,
+                    **make_excerpt(text),
+                ))
+            self.bulk_create(Post, batch)
+            created += len(batch)
+        dates = self.make_dates(count, days)
+        self.bulk_update_dates(Post, dates, ('created', 'updated'))
+        return list(zip(
+            Post.objects.order_by('pk').values_list('pk', flat=True), dates
+        ))
+
+    def create_comments(self, count, users, posts) -> int:
+        if not count:
+            return 0
+        weights = list(accumulate(
+            self.rng.paretovariate(COMMENTS_ALPHA) for _ in posts
+        ))
+        targets = sorted(
+            self.weighted_sample(range(len(posts)), weights, count)
+        )
+        dates = []
+        batch = []
+        for index in targets:
+            post_id, post_created = posts[index]
+            text = self.fake.sentence(nb_words=self.rng.randint(3, 30))
+            batch.append(Comment(
+                post_id=post_id,
+                author_id=self.rng.choice(users),
+                text=text,
+                text_html=compile_html(text),
+            ))
+            dates.append(post_created + timedelta(
+                minutes=self.rng.expovariate(1 / 600)
+            ))
+            if len(batch) >= self.batch_size:
+                self.bulk_create(Comment, batch)
+                batch = []
+        self.bulk_create(Comment, batch)
+        self.bulk_update_dates(Comment, dates)
+        return count
+
+    def create_follows(self, users, per_user) -> int:
+        if not per_user:
+            return 0
+        popular = list(accumulate(zipf_weights(len(users), FOLLOW_ALPHA)))
+        ranked = users[:]
+        self.rng.shuffle(ranked)
+        per_user = min(per_user, len(users) - 1)
+        total = 0
+        batch = []
+        for user_id in users:
+            wanted = min(len(users) - 1, max(
+                1, int(self.rng.expovariate(1 / per_user))
+            ))
+            authors = set()
+            while len(authors) < wanted:
+                author_id = self.rng.choices(ranked, cum_weights=popular)[0]
+                if author_id != user_id:
+                    authors.add(author_id)
+            batch.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in sorted(authors)
+            )
+            total += len(authors)
+            if len(batch) >= self.batch_size:
+                self.bulk_create(Follow, batch, ignore_conflicts=True)
+                batch = []
+        self.bulk_create(Follow, batch, ignore_conflicts=True)
+        return total
+
+    def create_about(self, users) -> None:
+        About.objects.create(
+            user_id=users[0],
+            description=self.fake.paragraph(nb_sentences=5),
+            role='Python-разработчик',
+            city=self.fake.city()[:50],
+        )
+        self.bulk_create(Tech, [
+            Tech(title=self.fake.word().title(),
+                 description=self.fake.paragraph(nb_sentences=2),
+                 number=number, is_studied=self.rng.random() < 0.5)
+            for number in range(1, TECH_COUNT + 1)
+        ], ignore_conflicts=True)
+
+    def fill_timelines(self, users) -> int:
+        """Заполняет ленты новых пользователей одним INSERT ... SELECT."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {TimelineEntry._meta.db_table} '
+                '(user_id, post_id, author_id, created) '
+                'SELECT f.user_id, p.id, p.author_id, p.created '
+                f'FROM {Follow._meta.db_table} f '
+                f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+                'WHERE f.user_id >= %s',
+                [users[0]]
+            )
+        trim_timelines(users)
+        return TimelineEntry.objects.filter(user_id__gte=users[0]).count()
+
+    def rebuild_search_index(self) -> int:
+        from search import index
+
+        if not index.is_available():
+            return 0
+        return index.rebuild(self.batch_size)
+
+    def check_sqlite(self):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Снимки поддерживаются только для SQLite')
+        connection.ensure_connection()
+
+    def snapshot(self, path: str) -> None:
+        self.check_sqlite()
+        target = sqlite3.connect(path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+        self.stdout.write(self.style.SUCCESS(f'Снимок сохранен в {path}'))
+
+    def restore(self, path: str) -> None:
+        self.check_sqlite()
+        source = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            source.backup(connection.connection)
+        except sqlite3.Error as error:
+            raise CommandError(f'Не удалось загрузить снимок: {error}')
+        finally:
+            source.close()
+        bump_versions(SITE_SCOPE, 'feeds')
+        self.stdout.write(self.style.SUCCESS(f'База загружена из {path}'))
@@ -0,0 +1,114 @@
+"""Поиск и удаление файлов MEDIA_ROOT, на которые ничего не ссылается.
+
+Ссылками считаются значения FileField всех моделей, задания очереди
+миниатюр и пути внутри MEDIA_URL в HTML полей из MEDIA_TEXT_FIELDS
+(картинки, загруженные через CKEditor). Миниатюры sorl-thumbnail живы,
+пока kvstore связывает их с живым исходным файлом.
+"""
+import os
+import re
+import time
+from urllib.parse import unquote, urlparse
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.models import ThumbnailJob
+
+URL_ATTRIBUTE = re.compile(r'''(?:src|href)\s*=\s*["']([^"']+)["']''')
+
+
+def iter_media_files(min_age: float):
+    """Файлы хранилища старше min_age секунд: пары (имя, размер)."""
+    root = default_storage.location
+    deadline = time.time() - min_age
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            stat = os.stat(path)
+            if stat.st_mtime <= deadline:
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                yield name, stat.st_size
+
+
+def file_field_references() -> set:
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField):
+                names.update(model._default_manager.exclude(
+                    **{field.name: ''}
+                ).values_list(field.name, flat=True).iterator())
+    names.update(ThumbnailJob.objects.values_list('source', flat=True))
+    names.discard(None)
+    return names
+
+
+def media_name_from_url(url: str):
+    path = urlparse(url).path
+    if path.startswith(settings.MEDIA_URL):
+        return unquote(path[len(settings.MEDIA_URL):])
+    return None
+
+
+def text_references() -> set:
+    names = set()
+    for label in settings.MEDIA_TEXT_FIELDS:
+        app_label, model_name, field_name = label.split('.')
+        model = apps.get_model(app_label, model_name)
+        texts = model._default_manager.filter(**{
+            f'{field_name}__contains': settings.MEDIA_URL
+        }).values_list(field_name, flat=True).iterator()
+        for text in texts:
+            for url in URL_ATTRIBUTE.findall(text):
+                name = media_name_from_url(url)
+                if name:
+                    names.add(name)
+    return names
+
+
+def thumbnail_references(sources) -> set:
+    """Имена миниатюр, которые kvstore связывает с файлами sources."""
+    rows = dict(KVStoreModel.objects.filter(
+        key__startswith=sorl_settings.THUMBNAIL_KEY_PREFIX
+    ).values_list('key', 'value'))
+    names = set()
+    for source in sources:
+        key = ImageFile(source, default_storage).key
+        thumbnails = rows.get(add_prefix(key, 'thumbnails'))
+        for thumbnail_key in deserialize(thumbnails) if thumbnails else ():
+            value = rows.get(add_prefix(thumbnail_key))
+            if value:
+                names.add(deserialize_image_file(value).name)
+    return names
+
+
+def find_orphans(min_age: float) -> list:
+    """Неиспользуемые файлы: список пар (имя, размер)."""
+    referenced = file_field_references() | text_references()
+    referenced |= thumbnail_references(referenced)
+    return [
+        (name, size) for name, size in iter_media_files(min_age)
+        if name not in referenced
+    ]
+
+
+def delete_orphans(orphans, batch_size: int):
+    """Удаляет файлы пачками, отдает число файлов и байт каждой пачки."""
+    for start in range(0, len(orphans), batch_size):
+        batch = orphans[start:start + batch_size]
+        for name, _ in batch:
+            storage = (default.storage if name.startswith(
+                sorl_settings.THUMBNAIL_PREFIX
+            ) else default_storage)
+            default.kvstore.delete(ImageFile(name, storage))
+            default_storage.delete(name)
+        yield len(batch), sum(size for _, size in batch)
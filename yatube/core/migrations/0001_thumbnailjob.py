@@ -0,0 +1,28 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, help_text='Дата и время вносятся атоматически', verbose_name='Дата и время создания')),
+                ('source', models.CharField(help_text='Путь к изображению в хранилище', max_length=255, unique=True, verbose_name='Исходный файл')),
+                ('field', models.CharField(help_text='Поле из THUMBNAIL_PRESETS, например posts.Post.image', max_length=100, verbose_name='Поле модели')),
+            ],
+            options={
+                'verbose_name': 'Задание на миниатюры',
+                'verbose_name_plural': 'Задания на миниатюры',
+                'ordering': ('created',),
+            },
+        ),
+    ]
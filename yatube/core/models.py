@@ -11,3 +11,26 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class ThumbnailJob(CreatedModel):
+    """Очередь изображений, для которых нужно создать миниатюры"""
+    source = models.CharField(
+        verbose_name='Исходный файл',
+        help_text='Путь к изображению в хранилище',
+        max_length=255,
+        unique=True,
+    )
+    field = models.CharField(
+        verbose_name='Поле модели',
+        help_text='Поле из THUMBNAIL_PRESETS, например posts.Post.image',
+        max_length=100,
+    )
+
+    def __str__(self) -> str:
+        return self.source
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Задание на миниатюры'
+        verbose_name_plural = 'Задания на миниатюры'
@@ -0,0 +1,228 @@
+import binascii
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(Sequence):
+    """Страница ключевой пагинации: без номера и общего количества."""
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, который считает объекты отдельным простым запросом.
+
+    ``count_queryset`` содержит только условия выборки, без аннотаций,
+    связанных таблиц и сортировки. Результат хранится в кэше под
+    ``cache_key``; ключ должен меняться вместе с составом ленты.
+    """
+
+    def __init__(self, object_list, per_page, count_queryset=None,
+                 cache_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_queryset = count_queryset
+        self.cache_key = cache_key
+
+    def count_objects(self):
+        if self.count_queryset is None:
+            return super().count
+        return self.count_queryset.count()
+
+    @cached_property
+    def count(self):
+        if self.cache_key is None:
+            return self.count_objects()
+        count = cache.get(self.cache_key)
+        if count is None:
+            count = self.count_objects()
+            cache.set(
+                self.cache_key, count, settings.CACHE_TIMEOUT_FEED_COUNT
+            )
+        return count
+
+    async def acount(self):
+        """Асинхронный count: async ORM и асинхронный API кэша."""
+        if 'count' in self.__dict__:
+            return self.count
+        count = None
+        if self.cache_key is not None:
+            count = await cache.aget(self.cache_key)
+        if count is None:
+            queryset = self.count_queryset
+            if queryset is None:
+                queryset = self.object_list
+            count = await queryset.acount()
+            if self.cache_key is not None:
+                await cache.aset(
+                    self.cache_key, count, settings.CACHE_TIMEOUT_FEED_COUNT
+                )
+        self.count = count
+        return count
+
+    async def apage(self, number):
+        await self.acount()
+        page = self.page(number)
+        page.object_list = [obj async for obj in page.object_list]
+        return page
+
+
+def estimate_table_rows(queryset):
+    """Примерное число строк таблицы без COUNT(*).
+
+    Берется из статистики SQLite (sqlite_stat1, ее обновляет ANALYZE),
+    а без нее — из наибольшего первичного ключа.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone():
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                    [table]
+                )
+                row = cursor.fetchone()
+                if row:
+                    return int(row[0].split()[0])
+    return queryset.model._default_manager.using(queryset.db).aggregate(
+        max_pk=Max('pk')
+    )['max_pk'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор списков админки для больших таблиц.
+
+    Для списка без условий число объектов оценивается по таблице, если
+    она больше ADMIN_EXACT_COUNT_LIMIT. С фильтрами или поиском
+    считается не больше ADMIN_EXACT_COUNT_LIMIT + 1 строк: дальние
+    страницы такой выборки недоступны, и фильтр нужно уточнить.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimate_table_rows(queryset)
+            if estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit + 1].count()
+
+
+class CursorPaginator:
+    """Пагинация по ключу (created, id) вместо OFFSET и COUNT(*).
+
+    Стоимость любой страницы одинакова: выборка идет по индексу от
+    позиции, закодированной в непрозрачном курсоре.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, per_page, field='created'):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.field = field
+
+    def encode_cursor(self, obj, direction):
+        value = getattr(obj, self.field)
+        data = json.dumps([direction, value.isoformat(), obj.pk])
+        return urlsafe_base64_encode(force_bytes(data))
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, value, pk = json.loads(urlsafe_base64_decode(cursor))
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (binascii.Error, TypeError, ValueError):
+            raise InvalidCursor('Неверный курсор страницы')
+        if value is None or direction not in (FORWARD, BACKWARD):
+            raise InvalidCursor('Неверный курсор страницы')
+        return direction, value, pk
+
+    def filter_page(self, cursor):
+        """Запрос страницы с одним лишним объектом и ее направление."""
+        field = self.field
+        queryset = self.object_list
+        direction = FORWARD
+        if cursor:
+            direction, value, pk = self.decode_cursor(cursor)
+            if direction == FORWARD:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__lt': value})
+                    | Q(**{field: value, 'pk__lt': pk})
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': value})
+                    | Q(**{field: value, 'pk__gt': pk})
+                )
+        if direction == FORWARD:
+            queryset = queryset.order_by(f'-{field}', '-pk')
+        else:
+            queryset = queryset.order_by(field, 'pk')
+        return queryset[:self.per_page + 1], direction
+
+    def make_page(self, objects, direction, cursor):
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if direction == BACKWARD:
+            objects.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+        next_cursor = previous_cursor = None
+        if objects and has_next:
+            next_cursor = self.encode_cursor(objects[-1], FORWARD)
+        if objects and has_previous:
+            previous_cursor = self.encode_cursor(objects[0], BACKWARD)
+        return CursorPage(objects, self, next_cursor, previous_cursor)
+
+    def page(self, cursor=None):
+        queryset, direction = self.filter_page(cursor)
+        return self.make_page(list(queryset), direction, cursor)
+
+    async def apage(self, cursor=None):
+        queryset, direction = self.filter_page(cursor)
+        objects = [obj async for obj in queryset]
+        return self.make_page(objects, direction, cursor)
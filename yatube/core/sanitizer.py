@@ -0,0 +1,165 @@
+"""Очистка HTML из CKEditor перед показом.
+
+compile_html разбирает исходный HTML один раз, при сохранении записи, и
+возвращает нормализованную разметку: только разрешенные теги, атрибуты,
+CSS-свойства и схемы ссылок, все теги закрыты. Видео YouTube заменяются
+заглушкой с превью: плеер загружается скриптом из
+``includes/video_embeds.html`` только по клику, а без JavaScript
+заглушка остается ссылкой на ролик.
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'address', 'b', 'big', 'blockquote', 'br', 'caption',
+    'cite', 'code', 'del', 'div', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'hr', 'i', 'img', 'ins', 'kbd', 'li', 'ol', 'p', 'pre', 'q', 's',
+    'samp', 'small', 'span', 'strike', 'strong', 'sub', 'sup', 'table',
+    'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'tt', 'u', 'ul', 'var',
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+# Теги, которые выбрасываются вместе с содержимым
+DROPPED_TAGS = {
+    'script', 'style', 'template', 'noscript', 'textarea', 'select',
+    'object', 'iframe', 'svg', 'math', 'title',
+}
+ALLOWED_ATTRIBUTES = {
+    '*': {'style', 'title', 'dir', 'lang'},
+    'a': {'href', 'name'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'ol': {'start', 'type'},
+    'td': {'colspan', 'rowspan', 'align', 'valign'},
+    'th': {'colspan', 'rowspan', 'align', 'valign', 'scope'},
+    'table': {'border', 'cellpadding', 'cellspacing', 'align', 'summary'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_SCHEMES = {'', 'http', 'https', 'mailto'}
+ALLOWED_STYLES = {
+    'background-color', 'border', 'border-collapse', 'color', 'float',
+    'font-family', 'font-size', 'font-style', 'font-weight', 'margin',
+    'margin-left', 'margin-right', 'text-align', 'text-decoration',
+    'vertical-align', 'width',
+}
+UNSAFE_STYLE_VALUE = re.compile(r'url\s*\(|expression|\\|[<>]', re.I)
+YOUTUBE_EMBED = re.compile(
+    r'^(?:https?:)?//(?:www\.)?youtube(?:-nocookie)?\.com/embed/'
+    r'(?P<id>[\w-]{6,20})'
+)
+VIDEO_PLACEHOLDER = (
+    '<div class="video-embed" data-embed="{embed}">'
+    '<a href="{watch}" target="_blank" rel="noopener">'
+    '<img src="{preview}" alt="Видео" width="480" height="360" '
+    'loading="lazy"></a></div>'
+)
+
+
+def is_safe_url(url: str) -> bool:
+    return urlparse(url.strip()).scheme.lower() in ALLOWED_SCHEMES
+
+
+def clean_style(style: str) -> str:
+    declarations = []
+    for declaration in style.split(';'):
+        name, _, value = declaration.partition(':')
+        name, value = name.strip().lower(), value.strip()
+        if (name in ALLOWED_STYLES and value
+                and not UNSAFE_STYLE_VALUE.search(value)):
+            declarations.append(f'{name}: {value}')
+    return '; '.join(declarations)
+
+
+def video_placeholder(src: str) -> str:
+    match = YOUTUBE_EMBED.match(src or '')
+    if not match:
+        return ''
+    video_id = match['id']
+    return VIDEO_PLACEHOLDER.format(
+        embed=escape(
+            f'https://www.youtube-nocookie.com/embed/{video_id}?autoplay=1'
+        ),
+        watch=escape(f'https://www.youtube.com/watch?v={video_id}'),
+        preview=escape(f'https://i.ytimg.com/vi/{video_id}/hqdefault.jpg'),
+    )
+
+
+class SanitizingParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.output = []
+        self.open_tags = []
+        self.dropped = []
+
+    def clean_attributes(self, tag, attrs) -> str:
+        allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(tag, set())
+        cleaned = []
+        for name, value in attrs:
+            value = value or ''
+            if name not in allowed:
+                continue
+            if name in URL_ATTRIBUTES and not is_safe_url(value):
+                continue
+            if name == 'style':
+                value = clean_style(value)
+                if not value:
+                    continue
+            cleaned.append(f' {name}="{escape(value)}"')
+        if tag == 'a' and any(
+            part.startswith(' href=') for part in cleaned
+        ):
+            cleaned.append(' rel="nofollow noopener"')
+        if tag == 'img':
+            cleaned.append(' loading="lazy"')
+        return ''.join(cleaned)
+
+    def handle_starttag(self, tag, attrs):
+        if self.dropped:
+            if tag in DROPPED_TAGS:
+                self.dropped.append(tag)
+            return
+        if tag == 'iframe':
+            self.output.append(video_placeholder(dict(attrs).get('src')))
+        if tag in DROPPED_TAGS:
+            self.dropped.append(tag)
+            return
+        if tag not in ALLOWED_TAGS:
+            return
+        self.output.append(f'<{tag}{self.clean_attributes(tag, attrs)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.dropped:
+            if tag == self.dropped[-1]:
+                self.dropped.pop()
+            return
+        if tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.output.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropped:
+            self.output.append(escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.output.append(f'</{self.open_tags.pop()}>')
+
+
+def compile_html(source: str) -> str:
+    """Безопасный HTML для показа вместо исходного текста."""
+    parser = SanitizingParser()
+    parser.feed(source or '')
+    parser.close()
+    return ''.join(parser.output).strip()
@@ -0,0 +1,45 @@
+"""Хранилище, которое называет файлы по хешу содержимого.
+
+Файл сохраняется как ``<каталог>/<ab>/<sha256><расширение>``, где
+каталог берется из upload_to или пути CKEditor. Одинаковые загрузки
+получают одно имя: байты хранятся один раз, а миниатюры sorl-thumbnail,
+имена которых зависят от имени исходника, создаются и хранятся тоже
+один раз.
+
+Файл живет, пока на него ссылается хотя бы одна запись: счетчик ссылок
+считает команда clean_media (core.media) и удаляет файлы без ссылок.
+При повторной загрузке время изменения файла обновляется, чтобы сборщик
+не удалил его до сохранения модели.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_content_name(self, name: str, content) -> str:
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
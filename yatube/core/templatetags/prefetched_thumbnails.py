@@ -0,0 +1,16 @@
+from django import template
+from sorl.thumbnail import default
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def prefetched_thumbnail(context, file_, geometry, **options):
+    """Миниатюра из словаря страницы ``thumbnails`` или из kvstore."""
+    if not file_:
+        return None
+    thumbnails = context.get('thumbnails') or {}
+    name = default.backend.get_thumbnail_name(file_, geometry, options)
+    if name in thumbnails:
+        return thumbnails[name]
+    return default.backend.get_thumbnail(file_, geometry, **options)
@@ -1,5 +1,25 @@
+import os
+import shutil
+import tempfile
+import time
 from http import HTTPStatus
-from django.test import TestCase
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from core.benchmark import (QUERY_METRICS, check_budget, load_budget,
+                            run_benchmark, url_names)
+from core.cache_backends import (SLOT_HEADER, CacheValueTooLarge,
+                                 SharedMemoryCache)
+from core.models import ThumbnailJob
+from core.sanitizer import compile_html
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          TimelineEntry)
 
 
 class ViewTestClass(TestCase):
@@ -7,3 +27,315 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertTemplateUsed(response, 'core/404.html')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class SharedMemoryCacheTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache')
+        self.cache = self.make_cache()
+
+    def make_cache(self, **options):
+        options.setdefault('MAX_ENTRIES', 16)
+        options.setdefault('SLOT_SIZE', 1024)
+        return SharedMemoryCache(self.location, {'OPTIONS': options})
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются"""
+        self.cache.set('key', {'value': [1, 2, 3]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2, 3]})
+        self.assertTrue(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('other', 1))
+        self.assertFalse(self.cache.add('other', 2))
+        self.assertEqual(self.cache.get('other'), 1)
+
+    def test_entries_are_shared_between_instances(self):
+        """Другой экземпляр (процесс) видит записи и атомарные инкременты"""
+        other = self.make_cache()
+        self.cache.set('counter', 1)
+        self.assertEqual(other.incr('counter', 5), 6)
+        self.assertEqual(self.cache.get('counter'), 6)
+        other.clear()
+        self.assertIsNone(self.cache.get('counter'))
+
+    def test_timeout(self):
+        """Просроченные записи не возвращаются"""
+        self.cache.set('key', 'value', timeout=0.05)
+        self.cache.set('forever', 'value', timeout=None)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+        with self.assertRaises(ValueError):
+            self.cache.incr('key')
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """При переполнении вытесняется давно не использованная запись"""
+        cache = self.make_cache(MAX_ENTRIES=2)
+        cache.set('first', 1)
+        cache.set('second', 2)
+        cache.get('first')
+        cache.set('third', 3)
+        self.assertEqual(cache.get('first'), 1)
+        self.assertIsNone(cache.get('second'))
+        self.assertEqual(cache.get('third'), 3)
+
+    def test_corrupt_entry_is_dropped(self):
+        """Поврежденное значение считается промахом и удаляется"""
+        self.cache.set('key', 'value')
+        self.cache.set('counter', 1)
+        other = self.make_cache()
+        with other._locked():
+            for key in ('key', 'counter'):
+                key = other.make_key(key)
+                start = (other._offset(other._find(key)) + SLOT_HEADER.size
+                         + len(key.encode()))
+                other._map[start:start + 4] = b'\xff' * 4
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+        self.assertFalse(self.cache.has_key('key'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('counter')
+        self.assertTrue(self.cache.add('counter', 1))
+
+    def test_too_large_value_is_not_stored(self):
+        """Значение больше слота не сохраняется, пропуск виден"""
+        self.cache.set('key', 'small')
+        with self.assertWarns(CacheValueTooLarge):
+            self.cache.set('key', 'x' * 2048)
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('other', 'x' * 2048)
+        self.assertEqual(self.make_cache().oversized_skips, 2)
+
+    def test_page_sized_value_fits_configured_slot(self):
+        """В слот из настроек помещается значение почти его размера"""
+        cache = self.make_cache(
+            MAX_ENTRIES=4, SLOT_SIZE=settings.CACHE_SLOT_SIZE
+        )
+        key = cache.make_key('page')
+        value = 'x' * (cache.max_value_size - len(key) - 64)
+        cache.set('page', value)
+        self.assertEqual(cache.get('page'), value)
+        self.assertEqual(cache.oversized_skips, 0)
+
+
+class SanitizerTests(TestCase):
+    def test_unsafe_markup_is_removed(self):
+        """Скрипты, обработчики и опасные ссылки вырезаются"""
+        html = compile_html(
+            '<p onclick="steal()" style="color: red; background: url(x)">'
+            'Текст <b>жирный<script>alert(1)</script></p>'
+            '<a href="javascript:alert(1)">ссылка</a>'
+            '<img src="/media/a.png" onerror="steal()">'
+            '<form><input name="q"></form>'
+        )
+        self.assertEqual(html, (
+            '<p style="color: red">Текст <b>жирный</b></p>'
+            '<a>ссылка</a>'
+            '<img src="/media/a.png" loading="lazy">'
+        ))
+
+    def test_youtube_iframe_becomes_placeholder(self):
+        """Плеер YouTube заменяется заглушкой, прочие iframe удаляются"""
+        html = compile_html(
+            '<iframe src="https://www.youtube.com/embed/dQw4w9WgXcQ?rel=0">'
+            '</iframe><iframe src="https://evil.example/"></iframe>'
+        )
+        self.assertNotIn('<iframe', html)
+        self.assertNotIn('evil', html)
+        self.assertIn('data-embed="https://www.youtube-nocookie.com/embed/'
+                      'dQw4w9WgXcQ?autoplay=1"', html)
+        self.assertIn('https://i.ytimg.com/vi/dQw4w9WgXcQ/hqdefault.jpg', html)
+
+
+class MediaGarbageTests(TestCase):
+    small_gif = (
+        b'\x47\x49\x46\x38\x39\x61\x02\x00'
+        b'\x01\x00\x80\x00\x00\x00\x00\x00'
+        b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+        b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+        b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+        b'\x0A\x00\x3B'
+    )
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='auth')
+
+    def write(self, name, content=b'data'):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def age_files(self):
+        old = time.time() - 2 * 24 * 60 * 60
+        for directory, _, files in os.walk(self.media_root):
+            for filename in files:
+                os.utime(os.path.join(directory, filename), (old, old))
+
+    def media_files(self):
+        return {
+            os.path.relpath(os.path.join(directory, filename), self.media_root)
+            for directory, _, files in os.walk(self.media_root)
+            for filename in files
+        }
+
+    def test_orphans_are_removed(self):
+        """Удаляются только файлы без ссылок и их миниатюры"""
+        live = Post.objects.create(
+            author=self.user,
+            text='<p><img src="/media/uploads/auth/inline.png"></p>',
+            image=SimpleUploadedFile('live.gif', self.small_gif),
+        )
+        deleted = Post.objects.create(
+            author=self.user,
+            text='Удаленный пост',
+            image=SimpleUploadedFile(
+                'deleted.gif', self.small_gif.replace(b'\xFF' * 3, b'\xFF\0\0')
+            ),
+        )
+        call_command('generate_thumbnails', stdout=StringIO())
+        deleted.delete()
+        self.write('uploads/auth/inline.png')
+        self.write('uploads/auth/unused.png')
+        self.age_files()
+        self.write('posts/fresh_upload.gif')
+        before = self.media_files()
+        thumbnails = {name for name in before if name.startswith('cache/')}
+        self.assertEqual(len(thumbnails), 4)
+
+        output = StringIO()
+        call_command('clean_media', '--dry-run', stdout=output)
+        self.assertEqual(self.media_files(), before)
+        self.assertIn('Будет удалено файлов: 4', output.getvalue())
+
+        call_command('clean_media', '--batch-size', '1', stdout=StringIO())
+        remaining = self.media_files()
+        self.assertEqual(
+            remaining - thumbnails,
+            {live.image.name, 'uploads/auth/inline.png',
+             'posts/fresh_upload.gif'}
+        )
+        self.assertEqual(len(remaining & thumbnails), 2)
+        self.assertTrue(Post.objects.filter(pk=live.pk).exists())
+
+    def test_identical_uploads_share_file_and_thumbnails(self):
+        """Одинаковые загрузки хранятся и уменьшаются один раз"""
+        first = Post.objects.create(
+            author=self.user, text='Первый',
+            image=SimpleUploadedFile('first.gif', self.small_gif),
+        )
+        call_command('generate_thumbnails', stdout=StringIO())
+        second = Post.objects.create(
+            author=self.user, text='Второй',
+            image=SimpleUploadedFile('second.GIF', self.small_gif),
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertTrue(first.image.name.endswith('.gif'))
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertEqual(
+            len([name for name in self.media_files()
+                 if name.startswith('posts/')]), 1
+        )
+
+        first.delete()
+        self.age_files()
+        call_command('clean_media', stdout=StringIO())
+        self.assertTrue(second.image.storage.exists(second.image.name))
+
+
+class SeedBenchmarkDataTests(TestCase):
+    options = ('--users', '20', '--groups', '4', '--posts', '60',
+               '--comments', '150', '--follows-per-user', '3')
+
+    def seed(self, *args):
+        call_command('seed_benchmark_data', *self.options, *args,
+                     stdout=StringIO())
+
+    def dataset(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'text', 'created', 'group__slug', 'author__username'
+            )),
+            list(Comment.objects.order_by('pk').values_list(
+                'text', 'post__text', 'created'
+            )),
+            sorted(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+        )
+
+    def test_dataset_is_complete_and_reproducible(self):
+        """Данные согласованы и повторяются при том же seed"""
+        self.seed()
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 150)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertFalse(Post.objects.filter(text_html='').exists())
+        self.assertFalse(Post.objects.filter(excerpt='').exists())
+        self.assertEqual(
+            sum(Post.objects.values_list('comments_count', flat=True)), 150
+        )
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            60
+        )
+        first = self.dataset()
+
+        get_user_model().objects.all().delete()
+        Group.objects.all().delete()
+        self.seed()
+        self.assertEqual(self.dataset(), first)
+
+    def test_database_must_be_empty(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class ViewBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.budget = load_budget(settings.VIEW_BUDGET_FILE)
+
+    def test_budget_covers_every_url(self):
+        """В бюджете есть все URL posts, about и users"""
+        self.assertEqual(set(self.budget['views']), url_names())
+
+    def test_query_counts_within_budget(self):
+        """Число SQL-запросов страниц не превышает бюджет"""
+        call_command(
+            'seed_benchmark_data', '--users', '20', '--groups', '3',
+            '--posts', '40', '--comments', '80', stdout=StringIO()
+        )
+        results = run_benchmark(repeat=2)
+        self.assertEqual(
+            check_budget(results, self.budget, metrics=QUERY_METRICS), []
+        )
+
+    def test_regressions_are_reported(self):
+        results = {
+            name: dict(expected)
+            for name, expected in self.budget['views'].items()
+        }
+        self.assertEqual(check_budget(results, self.budget), [])
+        results['posts:index']['queries'] += 1
+        results['posts:group_list']['p95_ms'] = (
+            self.budget['views']['posts:group_list']['p95_ms'] * 10 + 100
+        )
+        queries = self.budget['views']['posts:index']['queries']
+        queries_error = f'posts:index: queries {queries + 1} > {queries}'
+        self.assertEqual(len(check_budget(results, self.budget)), 2)
+        self.assertIn(queries_error, check_budget(results, self.budget))
+        self.assertEqual(
+            check_budget(results, self.budget, tolerance=100),
+            [queries_error]
+        )
@@ -0,0 +1,170 @@
+"""Миниатюры создаются заранее фоновым воркером, а не при рендеринге.
+
+Сохранение модели из ``THUMBNAIL_PRESETS`` ставит изображение в очередь
+``ThumbnailJob``. Команда ``generate_thumbnails`` создает все миниатюры
+из настроек. Шаблоны через PregeneratedThumbnailBackend только находят
+готовые миниатюры; пока миниатюры нет, тег возвращает None.
+
+Тег ``{% prefetched_thumbnail %}`` берет миниатюру из словаря
+``thumbnails`` в контексте, заполненного get_generated_many для всей
+страницы сразу.
+"""
+from contextlib import contextmanager
+from hashlib import md5
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE, KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.models import ThumbnailJob
+
+GENERATION_LOCK_TIMEOUT = 60 * 5
+
+# Отправляется с source= после создания миниатюр изображения
+thumbnails_generated = Signal()
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который не меняет размер при рендеринге."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        name = self.get_thumbnail_name(file_, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+    def get_thumbnail_name(self, file_, geometry_string, options):
+        source = ImageFile(file_)
+        return self._get_thumbnail_filename(
+            source, geometry_string, self.get_options(source, options)
+        )
+
+    def get_options(self, source, options):
+        """Те же настройки по умолчанию, что в ThumbnailBackend."""
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def generate(self, file_, geometry_string, **options):
+        return super().get_thumbnail(file_, geometry_string, **options)
+
+
+def get_presets(field: str) -> tuple:
+    return settings.THUMBNAIL_PRESETS.get(field, ())
+
+
+def is_generated(file_, field: str) -> bool:
+    return all(
+        default.backend.get_thumbnail(file_, geometry, **options)
+        for geometry, options in get_presets(field)
+    )
+
+
+def get_generated_many(items) -> dict:
+    """Готовые миниатюры для троек (файл, геометрия, опции) разом.
+
+    Возвращает словарь ``{имя миниатюры: ImageFile или None}``. Для
+    cached_db kvstore это один get_many к кэшу и, для промахов, один
+    запрос к базе вместо запроса на каждую миниатюру.
+    """
+    names = {
+        default.backend.get_thumbnail_name(file_, geometry, options)
+        for file_, geometry, options in items if file_
+    }
+    if not names:
+        return {}
+    if not isinstance(default.kvstore, KVStore):
+        return {
+            name: default.kvstore.get(ImageFile(name, default.storage))
+            for name in names
+        }
+    keys = {
+        add_prefix(ImageFile(name, default.storage).key): name
+        for name in names
+    }
+    kv_cache = default.kvstore.cache
+    values = kv_cache.get_many(list(keys))
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        missing = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kv_cache.set_many(missing, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(missing)
+    return {
+        name: (deserialize_image_file(values[key])
+               if values[key] not in (None, EMPTY_VALUE) else None)
+        for key, name in keys.items()
+    }
+
+
+def enqueue_thumbnails(file_, field: str) -> None:
+    if file_ and not is_generated(file_, field):
+        ThumbnailJob.objects.get_or_create(
+            source=file_.name, defaults={'field': field}
+        )
+
+
+@contextmanager
+def generation_lock(source: str):
+    """Не дает двум процессам создавать миниатюры одного файла."""
+    key = 'thumbnail_lock:' + md5(source.encode()).hexdigest()
+    acquired = cache.add(key, 1, GENERATION_LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(key)
+
+
+def generate_thumbnails(job) -> bool:
+    """Создает миниатюры задания и удаляет его.
+
+    Возвращает False, если файл уже обрабатывает другой процесс.
+    """
+    with generation_lock(job.source) as acquired:
+        if not acquired:
+            return False
+        source = ImageFile(job.source, default_storage)
+        for geometry, options in get_presets(job.field):
+            default.backend.generate(source, geometry, **options)
+        job.delete()
+    thumbnails_generated.send(sender=ThumbnailJob, source=job.source)
+    return True
+
+
+def connect_presets() -> None:
+    """Ставит изображения в очередь при сохранении моделей из настроек."""
+    for field in settings.THUMBNAIL_PRESETS:
+        app_label, model_name, field_name = field.split('.')
+
+        def receiver(sender, instance, raw, field=field,
+                     field_name=field_name, **kwargs):
+            if not raw:
+                enqueue_thumbnails(getattr(instance, field_name), field)
+
+        post_save.connect(
+            receiver,
+            sender=apps.get_model(app_label, model_name),
+            weak=False,
+            dispatch_uid=f'thumbnails:{field}',
+        )
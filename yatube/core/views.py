@@ -1,12 +1,165 @@
 from http import HTTPStatus
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.http import Http404
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from django.views.generic import ListView
 
+from core.cache import aget_versions, get_versions
+from core.paginators import (CachedCountPaginator, CursorPaginator,
+                             InvalidCursor)
+
 
 class PaginatorListView(ListView):
     paginate_by = settings.POSTS_COUNT_ON_PAGE
+    paginator_class = CachedCountPaginator
+    count_cache_key = None
+    count_cache_scopes = ('feeds',)
+    cursor_pagination = settings.CURSOR_PAGINATION
+    cursor_kwarg = 'cursor'
+    pagination_template_name = 'posts/includes/paginator.html'
+    page_window_on_each_side = 2
+    page_window_on_ends = 1
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.cursor_pagination:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor as error:
+            raise Http404(error)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_count_queryset(self, queryset):
+        """Запрос для подсчета: те же условия без сортировки и JOIN."""
+        return queryset.order_by().select_related(None)
+
+    def get_count_cache_kwargs(self):
+        return self.kwargs
+
+    def get_count_cache_scopes(self):
+        kwargs = self.get_count_cache_kwargs()
+        return self.count_cache_key.format(**kwargs), [
+            scope.format(**kwargs) for scope in self.count_cache_scopes
+        ]
+
+    def get_count_cache_key(self):
+        """Ключ кэша количества объектов ленты или None.
+
+        ``count_cache_key`` и ``count_cache_scopes`` — шаблоны строк с
+        аргументами ``get_count_cache_kwargs``. Версии областей входят
+        в ключ, поэтому сигналы, повышающие их, сбрасывают счетчик.
+        """
+        if self.count_cache_key is None:
+            return None
+        name, scopes = self.get_count_cache_scopes()
+        return ':'.join(map(str, (
+            'feed_count', name, *get_versions(scopes)
+        )))
+
+    async def aget_count_cache_key(self):
+        if self.count_cache_key is None:
+            return None
+        name, scopes = self.get_count_cache_scopes()
+        return ':'.join(map(str, (
+            'feed_count', name, *await aget_versions(scopes)
+        )))
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(
+            queryset,
+            per_page,
+            count_queryset=self.get_count_queryset(queryset),
+            cache_key=self.get_count_cache_key(),
+            **kwargs
+        )
+
+    def get_page_window(self, paginator, page):
+        """Номера страниц вокруг текущей, первой и последней.
+
+        Пропущенные номера заменяются многоточием, поэтому навигация
+        не растет вместе с количеством страниц.
+        """
+        if getattr(paginator, 'cursor_mode', False):
+            return []
+        return list(paginator.get_elided_page_range(
+            page.number,
+            on_each_side=self.page_window_on_each_side,
+            on_ends=self.page_window_on_ends,
+        ))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj')
+        if page is None or not self.pagination_template_name:
+            return context
+        context['page_window'] = self.get_page_window(page.paginator, page)
+        context['pagination'] = render_to_string(
+            self.pagination_template_name,
+            {'page_obj': page, 'page_window': context['page_window']},
+        )
+        return context
+
+
+class AsyncListMixin:
+    """Асинхронный GET для наследников PaginatorListView под ASGI.
+
+    Количество объектов, страница и данные из ``aprepare`` загружаются
+    через async ORM и асинхронный API кэша. Синхронными остаются
+    get_context_data и рендеринг шаблона, они идут через sync_to_async.
+    """
+    async_pagination = None
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        self.async_pagination = await self.apaginate_queryset(
+            self.object_list, self.get_paginate_by(self.object_list)
+        )
+        await self.aprepare()
+        context = await sync_to_async(self.get_context_data)()
+        response = self.render_to_response(context)
+        return await sync_to_async(response.render)()
+
+    async def aprepare(self):
+        """Заранее загружает данные, которые нужны get_context_data."""
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.async_pagination is not None:
+            return self.async_pagination
+        return super().paginate_queryset(queryset, page_size)
+
+    async def apaginate_queryset(self, queryset, page_size):
+        if self.cursor_pagination:
+            paginator = CursorPaginator(queryset, page_size)
+            try:
+                page = await paginator.apage(
+                    self.request.GET.get(self.cursor_kwarg)
+                )
+            except InvalidCursor as error:
+                raise Http404(error)
+            return paginator, page, page.object_list, page.has_other_pages()
+        paginator = self.paginator_class(
+            queryset,
+            page_size,
+            orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty(),
+            count_queryset=self.get_count_queryset(queryset),
+            cache_key=await self.aget_count_cache_key(),
+        )
+        number = (self.kwargs.get(self.page_kwarg)
+                  or self.request.GET.get(self.page_kwarg) or 1)
+        try:
+            if number == 'last':
+                await paginator.acount()
+                number = paginator.num_pages
+            page = await paginator.apage(int(number))
+        except (InvalidPage, ValueError) as error:
+            raise Http404(f'Неверная страница ({number}): {error}')
+        return paginator, page, page.object_list, page.has_other_pages()
 
 
 def page_not_found(request, exception):
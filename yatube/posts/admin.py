@@ -2,7 +2,10 @@ from django.contrib import admin
 from django import forms
 from django.utils.safestring import mark_safe
 
+from core.admin import AutocompleteFilter, LargeTableAdminMixin
 from posts.models import Post, Group, Comment, Follow
+from search.admin import FullTextSearchMixin
+from search.index import COMMENT, POST
 
 
 from ckeditor_uploader.widgets import CKEditorUploadingWidget
@@ -13,6 +16,28 @@ def format_field(self, field):
     return mark_safe(field)
 
 
+class CachedChoicesMixin:
+    """Варианты выбора ForeignKey считаются один раз за запрос.
+
+    Каждая строка с list_editable получает свой виджет выбора, и без
+    кэша каждый из них заново выполняет запрос вариантов.
+    """
+    cached_choice_fields = ()
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if request is None or db_field.name not in self.cached_choice_fields:
+            return formfield
+        choices = request.__dict__.setdefault('_admin_choices', {})
+        key = (self.model._meta.label, db_field.name)
+        if key not in choices:
+            choices[key] = list(formfield.choices)
+        formfield.choices = choices[key]
+        return formfield
+
+
 class PostAdminForm(forms.ModelForm):
     text = forms.CharField(
         label='Текст', widget=CKEditorUploadingWidget(
@@ -31,10 +56,19 @@ class CommentAdminForm(forms.ModelForm):
         fields = '__all__'
 
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'format_text', 'created', 'author', 'group')
+class PostAdmin(FullTextSearchMixin, CachedChoicesMixin, LargeTableAdminMixin,
+                admin.ModelAdmin):
+    list_display = ('pk', 'format_text', 'created', 'author', 'group',
+                    'comments_count')
+    list_select_related = ('author', 'group')
+    cached_choice_fields = ('group',)
     search_fields = ('text',)
-    list_filter = ('created', 'group', 'author',)
+    search_kind = POST
+    list_filter = (
+        'created',
+        ('group', AutocompleteFilter),
+        ('author', AutocompleteFilter),
+    )
     list_editable = ('group',)
     form = PostAdminForm
     empty_value_display = '-пусто-'
@@ -51,14 +85,18 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
     def group_post_count(self, obj) -> int:
-        return obj.posts.count()
+        return obj.posts_count
     group_post_count.short_description = 'Количество записей'
+    group_post_count.admin_order_field = 'posts_count'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, LargeTableAdminMixin,
+                   admin.ModelAdmin):
     list_display = ('id', 'format_text', 'format_post', 'author', 'created')
+    list_select_related = ('author', 'post')
     search_fields = ('text',)
-    list_filter = ('created', 'author')
+    search_kind = COMMENT
+    list_filter = ('created', ('author', AutocompleteFilter))
     form = CommentAdminForm
     empty_value_display = '-пусто-'
 
@@ -73,10 +111,11 @@ class CommentAdmin(admin.ModelAdmin):
     format_post.short_description = 'Пост'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'author')
-    search_fields = ('author',)
-    list_filter = ('author',)
+    list_select_related = ('user', 'author')
+    search_fields = ('=author__username',)
+    list_filter = (('author', AutocompleteFilter),)
     empty_value_display = '-пусто-'
 
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name: str = 'Записи пользователей'
+
+    def ready(self):
+        from posts import holes, signals  # noqa: F401
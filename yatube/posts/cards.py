@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core.thumbnails import get_generated_many, get_presets
+
+FEED = 'feed'
+GROUP = 'group'
+PROFILE = 'profile'
+DETAIL = 'detail'
+VARIANTS = (FEED, GROUP, PROFILE, DETAIL)
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+IMAGE_FIELD = 'posts.Post.image'
+
+
+def card_cache_key(post, variant: str) -> str:
+    """Ключ карточки меняется при правке поста и изменении его счетчиков."""
+    author_stats = getattr(post.author, 'stats', None)
+    return ':'.join(str(part) for part in (
+        'post_card',
+        variant,
+        post.pk,
+        post.updated.timestamp(),
+        author_stats.posts_count if author_stats else 0,
+        post.group.posts_count if post.group_id else 0,
+        post.comments_count,
+    ))
+
+
+def render_card(post, variant: str, thumbnails=None) -> str:
+    html = render_to_string(CARD_TEMPLATE, {
+        'post': post, 'variant': variant, 'thumbnails': thumbnails
+    })
+    cache.set(
+        card_cache_key(post, variant), html, settings.CACHE_TIMEOUT_POST_CARD
+    )
+    return html
+
+
+def get_cached_cards(posts, variant: str) -> dict:
+    """Достает готовые карточки страницы одним запросом к кэшу."""
+    keys = {card_cache_key(post, variant): post.pk for post in posts}
+    return {
+        keys[key]: html for key, html in cache.get_many(list(keys)).items()
+    }
+
+
+def prefetch_thumbnails(posts) -> dict:
+    """Миниатюры всех постов страницы одним обращением к kvstore."""
+    return get_generated_many(
+        (post.image, geometry, options)
+        for post in posts if post.image
+        for geometry, options in get_presets(IMAGE_FIELD)
+    )
+
+
+async def aget_cached_cards(posts, variant: str) -> dict:
+    keys = {card_cache_key(post, variant): post.pk for post in posts}
+    cached = await cache.aget_many(list(keys))
+    return {keys[key]: html for key, html in cached.items()}
@@ -0,0 +1,78 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import AuthorStats, Comment, Group, Post
+
+
+def shift_author_posts_count(author_id: int, delta: int) -> None:
+    """Атомарно изменяет счетчик записей автора на delta."""
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if delta < 0:
+        stats = stats.filter(posts_count__gte=-delta)
+    if stats.update(posts_count=F('posts_count') + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(author_id=author_id, posts_count=delta)
+    except IntegrityError:
+        AuthorStats.objects.filter(author_id=author_id).update(
+            posts_count=F('posts_count') + delta
+        )
+
+
+def shift_group_posts_count(group_id: int, delta: int) -> None:
+    """Атомарно изменяет счетчик записей группы на delta."""
+    if group_id is None:
+        return
+    groups = Group.objects.filter(pk=group_id)
+    if delta < 0:
+        groups = groups.filter(posts_count__gte=-delta)
+    groups.update(posts_count=F('posts_count') + delta)
+
+
+def shift_post_comments_count(post_id: int, delta: int) -> None:
+    """Атомарно изменяет счетчик комментариев поста на delta."""
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F('comments_count') + delta)
+
+
+def count_subquery(model, field: str) -> Coalesce:
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def reconcile_posts_counters() -> dict:
+    """Пересчитывает счетчики записей по фактическим данным.
+
+    Возвращает количество исправленных строк для каждого счетчика.
+    """
+    with transaction.atomic():
+        missing = Post.objects.exclude(
+            author__stats__isnull=False
+        ).order_by().values_list('author', flat=True).distinct()
+        AuthorStats.objects.bulk_create(
+            (AuthorStats(author_id=author_id) for author_id in missing),
+            ignore_conflicts=True,
+        )
+        authors = AuthorStats.objects.annotate(
+            actual=count_subquery(Post, 'author')
+        ).exclude(posts_count=F('actual')).update(
+            posts_count=count_subquery(Post, 'author')
+        )
+        groups = Group.objects.annotate(
+            actual=count_subquery(Post, 'group')
+        ).exclude(posts_count=F('actual')).update(
+            posts_count=count_subquery(Post, 'group')
+        )
+        posts = Post.objects.annotate(
+            actual=count_subquery(Comment, 'post')
+        ).exclude(comments_count=F('actual')).update(
+            comments_count=count_subquery(Comment, 'post')
+        )
+    return {'authors': authors, 'groups': groups, 'posts': posts}
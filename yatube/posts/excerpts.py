@@ -0,0 +1,95 @@
+"""Анонс поста для лент: начало текста без разметки и первое медиа.
+
+Анонс считается при сохранении поста, поэтому ленты не загружают
+полный HTML из CKEditor и не обрезают его при каждом рендеринге.
+"""
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.utils.text import Truncator
+
+SKIPPED_TAGS = {'script', 'style', 'template'}
+VIDEO_TAGS = {'iframe', 'video', 'source', 'embed'}
+# Теги, на границах которых браузер разрывает строку
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl',
+    'dt', 'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5',
+    'h6', 'header', 'hr', 'li', 'ol', 'p', 'pre', 'section', 'table',
+    'td', 'th', 'tr', 'ul',
+}
+MEDIA_URL_MAX_LENGTH = 500
+
+
+class ExcerptParser(HTMLParser):
+    """Собирает текст, первую картинку и первое видео из HTML.
+
+    Текст копится кусками как есть и делится на слова в close(), чтобы
+    выделение внутри слова, например Пре<b>вед</b>, не разрывало его.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks = []
+        self.words = []
+        self.image = ''
+        self.video = ''
+        self.skipped = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipped += 1
+            return
+        if tag in BLOCK_TAGS:
+            self.chunks.append(' ')
+        src = dict(attrs).get('src') or ''
+        if len(src) > MEDIA_URL_MAX_LENGTH:
+            return
+        if tag == 'img' and not self.image:
+            self.image = src
+        elif tag in VIDEO_TAGS and not self.video:
+            self.video = src
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self.skipped:
+            self.skipped -= 1
+        elif tag in BLOCK_TAGS:
+            self.chunks.append(' ')
+
+    def handle_data(self, data):
+        if not self.skipped:
+            self.chunks.append(data)
+
+    def close(self):
+        super().close()
+        self.words = ''.join(self.chunks).split()
+
+
+def plain_text(html: str) -> str:
+    parser = ExcerptParser()
+    parser.feed(html or '')
+    parser.close()
+    return ' '.join(parser.words)
+
+
+def make_excerpt(html: str) -> dict:
+    """Значения полей анонса Post для HTML текста."""
+    parser = ExcerptParser()
+    parser.feed(html or '')
+    parser.close()
+    return {
+        'excerpt': Truncator(' '.join(parser.words)).words(
+            settings.POST_EXCERPT_WORDS
+        ),
+        'lead_image': parser.image,
+        'lead_video': parser.video,
+    }
+
+
+def fill_excerpt(post) -> bool:
+    """Обновляет анонс поста, возвращает True, если он изменился."""
+    changed = False
+    for field, value in make_excerpt(post.text).items():
+        if getattr(post, field) != value:
+            setattr(post, field, value)
+            changed = True
+    return changed
@@ -1,8 +1,10 @@
 from ckeditor.widgets import CKEditorWidget
 from ckeditor_uploader.widgets import CKEditorUploadingWidget
 
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm, CharField
 
+from posts.images import normalize_image
 from posts.models import Comment, Post
 
 
@@ -21,6 +23,16 @@ class PostForm(ModelForm):
         #     ),
         # }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            upload = image
+            image, self.instance.image_bytes_saved = normalize_image(upload)
+            if image is not upload and hasattr(self.files, 'appendlist'):
+                # Копию закрывает и удаляет запрос вместе с его загрузками
+                self.files.appendlist(self.add_prefix('image'), image)
+        return image
+
 
 class CommentForm(ModelForm):
     text = CharField(label='Текст', widget=CKEditorWidget(
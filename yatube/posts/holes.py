@@ -0,0 +1,42 @@
+from core.holes import register_hole
+
+from posts.forms import CommentForm
+from posts.models import Follow
+
+
+@register_hole('switcher', 'posts/includes/switcher.html')
+def switcher_context(request, index_page=False):
+    return {'index_page': index_page}
+
+
+@register_hole('profile_title', 'posts/includes/profile_title.html')
+def profile_title_context(request, author_id, full_name):
+    return {
+        'my_posts_flag': request.user.id == author_id,
+        'full_name': full_name,
+    }
+
+
+@register_hole('follow_button', 'posts/includes/follow_button.html')
+def follow_button_context(request, author_id, username):
+    user = request.user
+    return {
+        'username': username,
+        'my_posts_flag': user.id == author_id,
+        'following': user.is_authenticated and Follow.objects.filter(
+            author_id=author_id, user=user
+        ).exists(),
+    }
+
+
+@register_hole('post_actions', 'posts/includes/post_actions.html')
+def post_actions_context(request, post_id, author_id):
+    return {
+        'post_id': post_id,
+        'is_author': request.user.id == author_id,
+    }
+
+
+@register_hole('comment_form', 'posts/includes/comment_form.html')
+def comment_form_context(request, post_id):
+    return {'post_id': post_id, 'form': CommentForm()}
@@ -0,0 +1,96 @@
+"""Нормализация изображений постов при загрузке.
+
+Загрузка пишется на диск по частям (TemporaryFileUploadHandler), затем
+изображение открывается только по заголовкам: формат и размеры
+проверяются до декодирования. JPEG декодируется сразу в уменьшенном
+масштабе через draft. Результат уменьшается до POST_IMAGE_MAX_EDGE по
+длинной стороне и сохраняется заново без EXIF и других метаданных.
+"""
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'JPEG': ('.jpg', 'image/jpeg'),
+    'PNG': ('.png', 'image/png'),
+    'GIF': ('.gif', 'image/gif'),
+    'WEBP': ('.webp', 'image/webp'),
+    'MPO': ('.jpg', 'image/jpeg'),
+}
+# Снимки телефонов со встроенным превью Pillow читает как MPO: из них
+# сохраняется основной кадр в JPEG
+SAVE_AS = {'MPO': 'JPEG'}
+
+
+def get_save_options(image_format: str) -> dict:
+    if image_format == 'JPEG':
+        return {'quality': settings.POST_IMAGE_QUALITY,
+                'optimize': True, 'progressive': True}
+    if image_format == 'WEBP':
+        return {'quality': settings.POST_IMAGE_QUALITY}
+    return {'optimize': True}
+
+
+def open_image(upload) -> Image.Image:
+    """Открывает изображение по заголовку и проверяет его размеры."""
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Загрузите правильное изображение.')
+    if image.format not in FORMATS:
+        raise ValidationError(
+            'Поддерживаются изображения JPEG, PNG, GIF и WebP.'
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Изображение слишком большое: {width}x{height} пикселей.'
+        )
+    return image
+
+
+def normalize_image(upload):
+    """Возвращает уменьшенную копию загрузки без метаданных.
+
+    Результат — пара (файл, сэкономленные байты). Если копия не меньше
+    оригинала, а уменьшать, чистить и конвертировать нечего,
+    возвращается оригинал. Копию закрывает вызывающий код.
+    """
+    image = open_image(upload)
+    image_format = SAVE_AS.get(image.format, image.format)
+    converted = image_format != image.format
+    if not converted and getattr(image, 'is_animated', False):
+        return upload, 0
+    max_edge = settings.POST_IMAGE_MAX_EDGE
+    too_large = max(image.size) > max_edge
+    has_metadata = bool(image.getexif()) or any(
+        key in image.info for key in ('icc_profile', 'xmp', 'comment')
+    )
+    if image_format == 'JPEG':
+        image.draft('RGB', (max_edge, max_edge))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    image.info = {
+        key: value for key, value in image.info.items()
+        if key in ('transparency', 'background')
+    }
+    extension, content_type = FORMATS[image_format]
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    result = TemporaryUploadedFile(name, content_type, 0, None)
+    try:
+        image.save(result, image_format, **get_save_options(image_format))
+    except Exception:
+        result.close()
+        raise
+    result.size = result.tell()
+    saved = upload.size - result.size
+    if saved <= 0 and not (too_large or has_metadata or converted):
+        result.close()
+        upload.seek(0)
+        return upload, 0
+    result.seek(0)
+    return result, max(saved, 0)
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from core.cache import SITE_SCOPE, bump_versions
+from posts.cards import VARIANTS, card_cache_key
+from posts.excerpts import fill_excerpt
+from posts.models import Post
+
+EXCERPT_FIELDS = ('excerpt', 'lead_image', 'lead_video')
+
+
+class Command(BaseCommand):
+    help = 'Заполняет анонсы записей, сохраненных до их появления'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = Post.objects.select_related(
+            'group', 'author__stats'
+        ).order_by('pk')
+        last_pk = 0
+        updated = 0
+        while True:
+            posts = list(
+                queryset.filter(pk__gt=last_pk)[:options['batch_size']]
+            )
+            if not posts:
+                break
+            last_pk = posts[-1].pk
+            changed = [post for post in posts if fill_excerpt(post)]
+            if changed:
+                Post.objects.bulk_update(changed, EXCERPT_FIELDS)
+                cache.delete_many([
+                    card_cache_key(post, variant)
+                    for post in changed for variant in VARIANTS
+                ])
+                updated += len(changed)
+        if updated:
+            bump_versions(SITE_SCOPE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено анонсов: {updated}'
+        ))
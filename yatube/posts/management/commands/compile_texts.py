@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from core.cache import SITE_SCOPE, bump_versions
+from core.sanitizer import compile_html
+from posts.cards import VARIANTS, card_cache_key
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = ('Заново собирает очищенный HTML записей и комментариев, '
+            'например после изменения правил очистки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def compile_batches(self, queryset, batch_size):
+        """Отдает пачки объектов, у которых изменился text_html."""
+        last_pk = 0
+        while True:
+            objects = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not objects:
+                return
+            last_pk = objects[-1].pk
+            changed = []
+            for obj in objects:
+                text_html = compile_html(obj.text)
+                if obj.text_html != text_html:
+                    obj.text_html = text_html
+                    changed.append(obj)
+            if changed:
+                queryset.model.objects.bulk_update(changed, ('text_html',))
+                yield changed
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = 0
+        for changed in self.compile_batches(Post.objects.select_related(
+            'group', 'author__stats'
+        ).order_by('pk'), batch_size):
+            cache.delete_many([
+                card_cache_key(post, variant)
+                for post in changed for variant in VARIANTS
+            ])
+            posts += len(changed)
+        comments = 0
+        for changed in self.compile_batches(
+            Comment.objects.order_by('pk'), batch_size
+        ):
+            bump_versions(*{
+                f'comments:{comment.post_id}' for comment in changed
+            })
+            comments += len(changed)
+        bump_versions(SITE_SCOPE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено записей: {posts}, комментариев: {comments}'
+        ))
@@ -0,0 +1,88 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from posts import views
+from posts.models import Comment, Follow, Group, Post, User
+
+PROBLEM_MARKERS = ('USE TEMP B-TREE',)
+
+
+def is_full_scan(line: str) -> bool:
+    """SCAN без индекса означает полный просмотр таблицы."""
+    detail = line.strip(' -|`')
+    return detail.startswith('SCAN ') and ' USING ' not in detail
+
+
+class Command(BaseCommand):
+    help = ('Выводит EXPLAIN QUERY PLAN для запросов лент и отмечает '
+            'полные просмотры таблиц и временные B-деревья сортировки')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail',
+            action='store_true',
+            help='Завершиться с ошибкой, если найдены проблемные планы',
+        )
+
+    def get_view_queryset(self, view_class, user=None, **kwargs):
+        request = RequestFactory().get('/')
+        request.user = user or AnonymousUser()
+        view = view_class()
+        view.setup(request, **kwargs)
+        return view.get_queryset()
+
+    def get_querysets(self):
+        page_size = views.PostListView.paginate_by
+        querysets = {
+            'index': self.get_view_queryset(views.PostListView),
+        }
+        group = Group.objects.first()
+        if group:
+            querysets['group_list'] = self.get_view_queryset(
+                views.GroupListView, slug=group.slug
+            )
+        author = User.objects.filter(posts__isnull=False).first()
+        if author:
+            querysets['profile'] = self.get_view_queryset(
+                views.ProfileListView, username=author.username
+            )
+        follow = Follow.objects.select_related('user').first()
+        if follow:
+            querysets['follow_index'] = self.get_view_queryset(
+                views.FollowListView, user=follow.user
+            )
+        querysets = {
+            name: queryset[:page_size]
+            for name, queryset in querysets.items()
+        }
+        post = Post.objects.first()
+        if post:
+            querysets['post_detail'] = Post.objects.filter(pk=post.pk)
+            querysets['post_comments'] = Comment.objects.select_related(
+                'author'
+            ).filter(post=post).order_by('-created', '-pk')[:page_size]
+        return querysets
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда поддерживает только SQLite')
+        problems = 0
+        for name, queryset in self.get_querysets().items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for line in queryset.explain().splitlines():
+                if is_full_scan(line) or any(
+                    marker in line for marker in PROBLEM_MARKERS
+                ):
+                    problems += 1
+                    self.stdout.write(self.style.WARNING(f'{line}  <--'))
+                else:
+                    self.stdout.write(line)
+        if not problems:
+            self.stdout.write(self.style.SUCCESS('Проблемных планов нет'))
+            return
+        message = f'Найдено проблемных шагов плана: {problems}'
+        if options['fail']:
+            raise CommandError(message)
+        self.stdout.write(self.style.WARNING(message))
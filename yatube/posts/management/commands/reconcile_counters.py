@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_posts_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счетчики записей'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_posts_counters()
+        for name, count in fixed.items():
+            self.stdout.write(f'{name}: исправлено {count}')
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
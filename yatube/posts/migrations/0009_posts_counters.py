@@ -0,0 +1,52 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_posts_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Group.objects.update(posts_count=Coalesce(Subquery(
+        Post.objects.filter(group=OuterRef('pk')).order_by().values(
+            'group'
+        ).annotate(count=Count('pk')).values('count')
+    ), 0))
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=row['author'], posts_count=row['count'])
+        for row in Post.objects.order_by().values('author').annotate(
+            count=Count('pk')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0008_alter_comment_created_alter_post_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(help_text='Автор, к которому относятся счетчики', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('posts_count', models.PositiveIntegerField(default=0, help_text='Счетчик обновляется автоматически', verbose_name='Количество записей')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Счетчик обновляется автоматически', verbose_name='Количество записей'),
+        ),
+        migrations.RunPython(fill_posts_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:47
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated(apps, schema_editor):
+    apps.get_model('posts', 'Post').objects.update(updated=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, help_text='Дата и время вносятся атоматически', verbose_name='Дата и время изменения'),
+        ),
+        migrations.RunPython(fill_updated, migrations.RunPython.noop),
+    ]
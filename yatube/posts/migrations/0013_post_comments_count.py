@@ -0,0 +1,31 @@
+# Generated by Django 4.1.7 on 2026-10-18 12:53
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comments_count(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Post.objects.update(comments_count=Coalesce(Subquery(
+        Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+            'post'
+        ).annotate(count=Count('pk')).values('count')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Счетчик обновляется автоматически', verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_comments_count, migrations.RunPython.noop),
+    ]
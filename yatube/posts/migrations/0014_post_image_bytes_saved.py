@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_bytes_saved',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='На сколько уменьшилось изображение при загрузке', verbose_name='Сэкономлено байт'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+from posts.excerpts import fill_excerpt
+
+BATCH_SIZE = 500
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    queryset = Post.objects.only(
+        'pk', 'text', 'excerpt', 'lead_image', 'lead_video'
+    ).order_by('pk')
+    last_pk = 0
+    while True:
+        posts = list(queryset.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not posts:
+            break
+        last_pk = posts[-1].pk
+        changed = [post for post in posts if fill_excerpt(post)]
+        Post.objects.bulk_update(
+            changed, ('excerpt', 'lead_image', 'lead_video')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_image_bytes_saved'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, help_text='Начало текста без разметки, считается при сохранении', verbose_name='Анонс'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='lead_image',
+            field=models.CharField(blank=True, editable=False, help_text='Адрес первого изображения в тексте', max_length=500, verbose_name='Первая картинка'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='lead_video',
+            field=models.CharField(blank=True, editable=False, help_text='Адрес первого видео в тексте', max_length=500, verbose_name='Первое видео'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.1.7 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+from core.sanitizer import compile_html
+
+BATCH_SIZE = 500
+
+
+def compile_texts(apps, schema_editor):
+    for model_name in ('Post', 'Comment'):
+        model = apps.get_model('posts', model_name)
+        queryset = model.objects.only('pk', 'text').order_by('pk')
+        last_pk = 0
+        while True:
+            objects = list(queryset.filter(pk__gt=last_pk)[:BATCH_SIZE])
+            if not objects:
+                break
+            last_pk = objects[-1].pk
+            for obj in objects:
+                obj.text_html = compile_html(obj.text)
+            model.objects.bulk_update(objects, ('text_html',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, help_text='Очищенный HTML текста, считается при сохранении', verbose_name='Текст для показа'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, help_text='Очищенный HTML текста, считается при сохранении', verbose_name='Текст для показа'),
+        ),
+        migrations.RunPython(compile_texts, migrations.RunPython.noop),
+    ]
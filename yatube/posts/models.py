@@ -23,6 +23,12 @@ class Group(models.Model):
         verbose_name='Описание',
         help_text='Описание группы'
     )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество записей',
+        help_text='Счетчик обновляется автоматически',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self) -> str:
         return self.title
@@ -32,12 +38,62 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+class AuthorStats(models.Model):
+    """Денормализованные счетчики автора, чтобы не считать их в лентах"""
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор',
+        help_text='Автор, к которому относятся счетчики'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество записей',
+        help_text='Счетчик обновляется автоматически',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self) -> str:
+        return f'{self.author}: {self.posts_count}'
+
+
 class Post(CreatedModel):
     text = RichTextUploadingField(
         config_name='ckeditor_post',
         verbose_name='Текст',
         help_text='Текст поста'
     )
+    text_html = models.TextField(
+        verbose_name='Текст для показа',
+        help_text='Очищенный HTML текста, считается при сохранении',
+        blank=True,
+        editable=False,
+    )
+    excerpt = models.TextField(
+        verbose_name='Анонс',
+        help_text='Начало текста без разметки, считается при сохранении',
+        blank=True,
+        editable=False,
+    )
+    lead_image = models.CharField(
+        verbose_name='Первая картинка',
+        help_text='Адрес первого изображения в тексте',
+        max_length=500,
+        blank=True,
+        editable=False,
+    )
+    lead_video = models.CharField(
+        verbose_name='Первое видео',
+        help_text='Адрес первого видео в тексте',
+        max_length=500,
+        blank=True,
+        editable=False,
+    )
 
     author = models.ForeignKey(
         User,
@@ -59,12 +115,43 @@ class Post(CreatedModel):
         verbose_name='Изображение',
         help_text='Загрузите изображение'
     )
+    image_bytes_saved = models.PositiveIntegerField(
+        verbose_name='Сэкономлено байт',
+        help_text='На сколько уменьшилось изображение при загрузке',
+        default=0,
+        editable=False,
+    )
+    updated = models.DateTimeField(
+        verbose_name='Дата и время изменения',
+        help_text='Дата и время вносятся атоматически',
+        auto_now=True,
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        help_text='Счетчик обновляется автоматически',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Запись'
         verbose_name_plural = 'Записи'
         default_related_name = 'posts'
+        indexes = (
+            models.Index(
+                fields=('created',),
+                name='post_created_idx'
+            ),
+            models.Index(
+                fields=('author', 'created'),
+                name='post_author_created_idx'
+            ),
+            models.Index(
+                fields=('group', 'created'),
+                name='post_group_created_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         return mark_safe(f'{self.text[:15]}...')
@@ -76,6 +163,12 @@ class Comment(CreatedModel):
         verbose_name='Текст',
         help_text='Текст комментария'
     )
+    text_html = models.TextField(
+        verbose_name='Текст для показа',
+        help_text='Очищенный HTML текста, считается при сохранении',
+        blank=True,
+        editable=False,
+    )
 
     author = models.ForeignKey(
         User,
@@ -94,6 +187,12 @@ class Comment(CreatedModel):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         default_related_name = 'comments'
+        indexes = (
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         return mark_safe(f'{self.text[:15]}...')
@@ -124,6 +223,59 @@ class Follow(models.Model):
                 name='unique_follower'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('author', 'user'),
+                name='follow_author_user_idx'
+            ),
+        )
 
     def __str__(self) -> str:
         return (f'{self.user} подписан на посты {self.author}')
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        help_text='Владелец ленты',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        help_text='Пост, попавший в ленту',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+        help_text='Автор поста',
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата и время создания поста',
+        help_text='Копия даты поста для сортировки ленты',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        default_related_name = 'timeline_entries'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-created'),
+                name='timeline_user_created_idx'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.post_id} в ленте {self.user}'
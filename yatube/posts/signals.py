@@ -0,0 +1,209 @@
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core.cache import bump_versions
+from core.sanitizer import compile_html
+from core.thumbnails import thumbnails_generated
+from posts.cards import VARIANTS, card_cache_key
+from posts.counters import (shift_author_posts_count, shift_group_posts_count,
+                            shift_post_comments_count)
+from posts.excerpts import fill_excerpt
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.timeline import backfill_timeline, fan_out_post, prune_timeline
+
+
+@receiver(pre_save, sender=Post)
+def update_post_excerpt(sender, instance, raw, **kwargs):
+    if not raw and 'text' not in instance.get_deferred_fields():
+        fill_excerpt(instance)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def compile_text_html(sender, instance, raw, **kwargs):
+    if not raw and 'text' not in instance.get_deferred_fields():
+        instance.text_html = compile_html(instance.text)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_delete, sender=Post)
+def remember_post_relations(sender, instance, raw=False, **kwargs):
+    """Запоминает группу и автора до изменения поста.
+
+    По ним пересчитываются счетчики и сбрасываются страницы, на
+    которых пост был виден.
+    """
+    instance._previous_group_id = instance._previous_author_id = None
+    instance._previous_page_scopes = set()
+    if raw or instance.pk is None:
+        return
+    previous = Post.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'author_id', 'group__slug', 'author__username'
+    ).first()
+    if previous is None:
+        return
+    (instance._previous_group_id, instance._previous_author_id,
+     group_slug, username) = previous
+    instance._previous_page_scopes.add(f'profile:{username}')
+    if group_slug:
+        instance._previous_page_scopes.add(f'group:{group_slug}')
+
+
+def post_page_scopes(post) -> set:
+    """Области кэша страниц, на которых виден пост.
+
+    Связи, не изменившиеся с прошлого сохранения, берутся из
+    remember_post_relations и не загружаются заново.
+    """
+    scopes = {'posts', f'post:{post.pk}'}
+    scopes |= getattr(post, '_previous_page_scopes', set())
+    if post.author_id != getattr(post, '_previous_author_id', None):
+        scopes.add(f'profile:{post.author.username}')
+    if (post.group_id
+            and post.group_id != getattr(post, '_previous_group_id', None)):
+        scopes.add(f'group:{post.group.slug}')
+    return scopes
+
+
+@receiver(post_save, sender=Post)
+def update_posts_counters_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        shift_author_posts_count(instance.author_id, 1)
+        shift_group_posts_count(instance.group_id, 1)
+        fan_out_post(instance)
+        bump_versions('feeds')
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        shift_group_posts_count(previous_group_id, -1)
+        shift_group_posts_count(instance.group_id, 1)
+        bump_versions('feeds')
+    previous_author_id = getattr(instance, '_previous_author_id', None)
+    if previous_author_id not in (None, instance.author_id):
+        shift_author_posts_count(previous_author_id, -1)
+        shift_author_posts_count(instance.author_id, 1)
+        TimelineEntry.objects.filter(post=instance).delete()
+        fan_out_post(instance)
+        bump_versions('feeds')
+
+
+@receiver(post_delete, sender=Post)
+def update_posts_counters_on_delete(sender, instance, **kwargs):
+    shift_author_posts_count(instance.author_id, -1)
+    shift_group_posts_count(instance.group_id, -1)
+    bump_versions('feeds')
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline_on_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        backfill_timeline(instance.user_id, instance.author_id)
+        bump_versions(f'timeline:{instance.user_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline_on_unfollow(sender, instance, **kwargs):
+    prune_timeline(instance.user_id, instance.author_id)
+    bump_versions(f'timeline:{instance.user_id}')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    bump_versions(*post_page_scopes(instance))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_post_comments(sender, instance, **kwargs):
+    bump_versions(f'comments:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+def update_comments_count_on_save(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        shift_post_comments_count(instance.post_id, 1)
+
+
+def deleted_with_post(comment, origin) -> bool:
+    """Комментарий удаляется каскадом вместе со своей записью.
+
+    Счетчик такой записи не нужен, а ее страницы сбрасывают
+    обработчики удаления Post.
+    """
+    if isinstance(origin, Post):
+        return origin.pk == comment.post_id
+    return isinstance(origin, QuerySet) and origin.model is Post
+
+
+@receiver(post_delete, sender=Comment)
+def update_comments_count_on_delete(sender, instance, origin=None, **kwargs):
+    if not deleted_with_post(instance, origin):
+        shift_post_comments_count(instance.post_id, -1)
+
+
+def comment_page_scopes(comment) -> set:
+    """Области кэша страниц, на которых виден счетчик комментариев поста."""
+    scopes = {
+        'posts', f'post:{comment.post_id}', f'comments:{comment.post_id}'
+    }
+    post = Post.objects.filter(pk=comment.post_id).values_list(
+        'group__slug', 'author__username'
+    ).first()
+    if post is not None:
+        group_slug, username = post
+        scopes.add(f'profile:{username}')
+        if group_slug:
+            scopes.add(f'group:{group_slug}')
+    return scopes
+
+
+@receiver(post_save, sender=Comment)
+def invalidate_comment_pages_on_save(sender, instance, created, raw,
+                                     **kwargs):
+    if created and not raw:
+        bump_versions(*comment_page_scopes(instance))
+    else:
+        bump_versions(
+            f'comments:{instance.post_id}', f'post:{instance.post_id}'
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages_on_delete(sender, instance, origin=None,
+                                       **kwargs):
+    if not deleted_with_post(instance, origin):
+        bump_versions(*comment_page_scopes(instance))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    bump_versions(f'profile:{instance.author.username}')
+
+
+@receiver(thumbnails_generated)
+def invalidate_cards_with_thumbnails(sender, source, **kwargs):
+    """Карточки, отрендеренные без миниатюр, рендерятся заново."""
+    posts = Post.objects.select_related('group', 'author__stats').filter(
+        image=source
+    )
+    keys = [
+        card_cache_key(post, variant)
+        for post in posts for variant in VARIANTS
+    ]
+    if keys:
+        cache.delete_many(keys)
+        bump_versions(*{
+            scope for post in posts for scope in post_page_scopes(post)
+        })
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    bump_versions(f'group:{instance.slug}')
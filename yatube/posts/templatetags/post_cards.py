@@ -0,0 +1,18 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.cards import FEED, render_card
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    html = context.get('post_cards', {}).get(post.pk)
+    if html is None:
+        html = render_card(
+            post,
+            context.get('card_variant', FEED),
+            context.get('thumbnails'),
+        )
+    return mark_safe(html)
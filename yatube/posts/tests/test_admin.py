@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from about.models import About
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminQueryBudgetTests(TestCase):
+    changelists = (
+        'admin:posts_post_changelist',
+        'admin:posts_group_changelist',
+        'admin:posts_comment_changelist',
+        'admin:posts_follow_changelist',
+        'admin:about_about_changelist',
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(username='admin')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        """Добавляет по count строк в каждую таблицу админки."""
+        start = User.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(username=f'user{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='Описание'
+            )
+            post = Post.objects.create(
+                author=user, group=group, text=f'Запись {i}'
+            )
+            Comment.objects.create(post=post, author=user, text='Комментарий')
+            Follow.objects.create(user=user, author=self.admin)
+            About.objects.create(user=user, description='Описание')
+
+    def count_queries(self, url_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_query_count_does_not_grow_with_rows(self):
+        """Число запросов списка в админке не зависит от числа строк"""
+        self.add_rows(2)
+        few = {name: self.count_queries(name) for name in self.changelists}
+        self.add_rows(10)
+        for name in self.changelists:
+            with self.subTest(changelist=name):
+                self.assertEqual(self.count_queries(name), few[name])
+
+    def test_author_filter_does_not_list_users(self):
+        """Фильтр по автору не выводит всех пользователей"""
+        self.add_rows(3)
+        author = User.objects.get(username='user2')
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url)
+        self.assertNotContains(response, 'author__id__exact=')
+        self.assertContains(response, 'data-field-name="author"')
+        response = self.client.get(url, {'author__id__exact': author.pk})
+        self.assertEqual(
+            [post.author for post in response.context['cl'].result_list],
+            [author]
+        )
+        self.assertContains(
+            response, f'<option value="{author.pk}" selected>user2</option>',
+            html=True
+        )
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=3)
+    def test_large_changelist_count_is_estimated(self):
+        """Большой список не считается точно, выборка считается до лимита"""
+        self.add_rows(5)
+        Post.objects.filter(pk=Post.objects.order_by('pk').first().pk).delete()
+        url = reverse('admin:posts_post_changelist')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 4)
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE sqlite_stat1')
+        response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 5)
+        response = self.client.get(url, {'q': 'Запись'})
+        self.assertEqual(response.context['cl'].result_count, 4)
+        self.assertIsNone(response.context['cl'].full_result_count)
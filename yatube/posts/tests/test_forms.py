@@ -1,13 +1,19 @@
 import shutil
 import tempfile
+from io import BytesIO
 from typing import Dict
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from posts import forms, images
 from posts.models import Group, Post
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -125,12 +131,87 @@ class PostFormTests(TestCase):
             'Неверные аттрибуты редактированного поста'
         )
 
+    def make_upload(self, name, size, image_format, **options):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'teal').save(buffer, image_format, **options)
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def test_large_image_is_normalized(self):
+        """Большое изображение уменьшается и теряет метаданные"""
+        exif = Image.Exif()
+        exif[0x010F] = 'Тестовая камера'
+        uploaded = self.make_upload(
+            'camera.jpg', (3200, 1800), 'JPEG', quality=100, exif=exif
+        )
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Пост с фотографией', 'image': uploaded,
+        })
+        post = Post.objects.get(text='Пост с фотографией')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(max(image.size), settings.POST_IMAGE_MAX_EDGE)
+            self.assertFalse(image.getexif(), 'EXIF не удален')
+        self.assertEqual(
+            post.image_bytes_saved, uploaded.size - post.image.size
+        )
+        self.assertGreater(post.image_bytes_saved, 0)
+
+    def test_mpo_photo_is_saved_as_jpeg(self):
+        """Снимок с встроенным превью (MPO) сохраняется как JPEG"""
+        uploaded = self.make_upload(
+            'phone.jpg', (64, 48), 'MPO', save_all=True,
+            append_images=[Image.new('RGB', (16, 12))]
+        )
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост со снимком телефона', 'image': uploaded},
+        )
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get(text='Пост со снимком телефона')
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (64, 48))
+
+    def test_normalized_copy_is_closed(self):
+        """Временная копия изображения закрывается после запроса"""
+        results = []
+
+        def normalize(upload):
+            result = images.normalize_image(upload)
+            results.append(result[0])
+            return result
+
+        with mock.patch.object(forms, 'normalize_image', normalize):
+            self.authorized_client.post(reverse('posts:post_create'), {
+                'text': 'Пост с копией картинки',
+                'image': self.make_upload('big.png', (3200, 10), 'PNG'),
+            })
+        self.assertTrue(Post.objects.filter(
+            text='Пост с копией картинки'
+        ).exists())
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0].closed)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_image_with_too_many_pixels_is_rejected(self):
+        """Изображение с огромным числом пикселей не принимается"""
+        response = self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Пост с огромной картинкой',
+            'image': self.make_upload('huge.png', (20, 20), 'PNG'),
+        })
+        self.assertTrue(response.context['form'].has_error('image'))
+        self.assertFalse(
+            Post.objects.filter(text='Пост с огромной картинкой').exists()
+        )
+
     def check_post_exists(self, form_data: Dict[str, str], msg: str) -> None:
         self.assertTrue(Post.objects.filter(
             text=form_data['text'],
             author=self.user,
             group=form_data['group'],
-            image=f'posts/{form_data["image"]}'
+            image=default_storage.get_content_name(
+                f'posts/{form_data["image"]}', ContentFile(self.small_gif)
+            )
         ).exists(), msg)
 
 
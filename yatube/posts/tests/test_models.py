@@ -1,7 +1,13 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 
-from posts.models import Group, Post, Comment, Follow
+from posts.excerpts import make_excerpt
+from posts.models import AuthorStats, Group, Post, Comment, Follow
 
 
 User = get_user_model()
@@ -174,3 +180,181 @@ class FollowModelTest(TestCase):
                     self.follow._meta.get_field(
                         field).help_text, expected_value
                 )
+
+
+class PostsCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_counter')
+        cls.group1 = Group.objects.create(
+            title='Тестовая группа 1',
+            slug='test_slug_1',
+            description='Тестовое описание',
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа 2',
+            slug='test_slug_2',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, author_count, group1_count, group2_count):
+        self.group1.refresh_from_db()
+        self.group2.refresh_from_db()
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).posts_count,
+            author_count,
+            'Неверный счетчик записей автора'
+        )
+        self.assertEqual(self.group1.posts_count, group1_count,
+                         'Неверный счетчик записей группы')
+        self.assertEqual(self.group2.posts_count, group2_count,
+                         'Неверный счетчик записей группы')
+
+    def test_counters_follow_post_lifecycle(self):
+        """Счетчики меняются при создании, переносе и удалении записи"""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group1
+        )
+        Post.objects.create(author=self.user, text='Пост без группы')
+        self.assertCounters(2, 1, 0)
+        post.group = self.group2
+        post.save()
+        self.assertCounters(2, 0, 1)
+        post.delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_counters_follow_author_change(self):
+        """Смена автора переносит запись в счетчик нового автора"""
+        other = User.objects.create_user(username='auth_counter_other')
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group1
+        )
+        post.author = other
+        post.save()
+        self.assertCounters(0, 1, 0)
+        self.assertEqual(
+            AuthorStats.objects.get(author=other).posts_count, 1
+        )
+
+    def test_reconcile_counters_command(self):
+        """Команда reconcile_counters исправляет рассинхронизацию"""
+        Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group1
+        )
+        AuthorStats.objects.filter(author=self.user).update(posts_count=7)
+        Group.objects.filter(pk=self.group2.pk).update(posts_count=3)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCounters(1, 1, 0)
+
+    def test_comments_count_follows_comments(self):
+        """Счетчик комментариев меняется вместе с комментариями"""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий'
+        )
+        Comment.objects.create(post=post, author=self.user, text='Еще один')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+        call_command('reconcile_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_post_delete_skips_comments_count(self):
+        """Каскадное удаление комментариев не обновляет удаляемую запись"""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.user, text=f'Комментарий {i}')
+            for i in range(5)
+        )
+        with CaptureQueriesContext(connection) as context:
+            post.delete()
+        updates = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ]
+        self.assertEqual(updates, [])
+        self.assertFalse(Comment.objects.filter(post_id=post.pk).exists())
+
+
+class PostExcerptTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth_excerpt')
+
+    def test_excerpt_is_computed_on_save(self):
+        """При сохранении считаются анонс, первая картинка и видео"""
+        post = Post.objects.create(author=self.user, text=(
+            '<p>Первый &amp; <b>абзац</b></p><script>alert(1)</script>'
+            '<img src="/media/uploads/a.png"><img src="/media/b.png">'
+            '<iframe src="https://video.example/embed/1"></iframe>'
+            + '<p>слово</p>' * 30
+        ))
+        self.assertTrue(post.excerpt.startswith('Первый & абзац слово'))
+        self.assertNotIn('alert', post.excerpt)
+        self.assertEqual(len(post.excerpt.split()), 25)
+        self.assertEqual(post.lead_image, '/media/uploads/a.png')
+        self.assertEqual(post.lead_video, 'https://video.example/embed/1')
+
+    def test_inline_markup_does_not_split_words(self):
+        """Выделение внутри слова не разрывает его, абзацы разделены"""
+        self.assertEqual(
+            make_excerpt('<p>Пре<b>вед</b> мир</p>')['excerpt'], 'Превед мир'
+        )
+        self.assertEqual(
+            make_excerpt('<p>один</p><p>два<br>три</p>')['excerpt'],
+            'один два три'
+        )
+
+    def test_backfill_excerpts_command(self):
+        """Команда backfill_excerpts заполняет анонсы старых записей"""
+        post = Post.objects.create(author=self.user, text='<p>Старый пост</p>')
+        Post.objects.filter(pk=post.pk).update(excerpt='', lead_image='')
+        call_command('backfill_excerpts', '--batch-size', '1',
+                     stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Старый пост')
+
+    def test_text_html_is_compiled_on_save(self):
+        """Запись и комментарий хранят очищенный HTML рядом с исходным"""
+        post = Post.objects.create(
+            author=self.user, text='<p>Пост<script>x</script>'
+        )
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='<i onclick="x()">Ответ</i>'
+        )
+        self.assertEqual(post.text_html, '<p>Пост</p>')
+        self.assertEqual(comment.text_html, '<i>Ответ</i>')
+        Post.objects.filter(pk=post.pk).update(text_html='')
+        call_command('compile_texts', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Пост</p>')
+
+
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth_author')
+        cls.follower = User.objects.create_user(username='auth_follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group
+        )
+        Comment.objects.create(
+            author=cls.follower, post=cls.post, text='Комментарий'
+        )
+
+    def test_feeds_use_indexes(self):
+        """Запросы лент не сканируют таблицы целиком и не сортируют"""
+        call_command('explain_feeds', '--fail', stdout=StringIO())
@@ -137,25 +137,47 @@ class IndexPageCacheTest(TestCase):
 
     def setUp(self):
         self.guest_client = Client()
+        cache.clear()
 
     def test_cache_index_page(self):
         """Страница index_page кэшируется."""
         response = self.guest_client.get(reverse('posts:index'))
-        post = Post.objects.get(id=self.POSTS_TEST_ITEMS)
         content = response.content
-        post.delete()
         response_cache = self.guest_client.get(reverse('posts:index'))
-        content_cache = response_cache.content
+        self.assertTemplateNotUsed(
+            response_cache,
+            'posts/index.html',
+            'Страница не кэширована'
+        )
         self.assertEqual(
             content,
-            content_cache,
+            response_cache.content,
             'Страница не кэширована'
         )
-        cache.clear()
+
+    def test_cache_index_page_invalidated_on_post_delete(self):
+        """Кэш index_page сбрасывается сразу после удаления поста."""
+        response = self.guest_client.get(reverse('posts:index'))
+        post = Post.objects.get(id=self.POSTS_TEST_ITEMS)
+        content = response.content
+        post.delete()
         response_no_cache = self.guest_client.get(reverse('posts:index'))
-        content_no_cache = response_no_cache.content
         self.assertNotEqual(
-            content_cache,
-            content_no_cache,
+            content,
+            response_no_cache.content,
             'Страница не обновлена'
         )
+        self.assertNotContains(response_no_cache, post.text)
+
+    def test_cache_profile_page_invalidated_on_follow(self):
+        """Кэш профиля сбрасывается после новой подписки на автора."""
+        follower = User.objects.create_user(username='Follower')
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': self.user})
+        )
+        self.assertContains(response, 'Подписчиков: 0')
+        Follow.objects.create(user=follower, author=self.user)
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': self.user})
+        )
+        self.assertContains(response, 'Подписчиков: 1')
@@ -1,18 +1,37 @@
+import os
+import re
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
+from asgiref.sync import sync_to_async
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test import (AsyncRequestFactory, Client, RequestFactory,
+                         TestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Group, Post, Comment, Follow
+from core.models import ThumbnailJob
+from core.thumbnails import generation_lock
+from core.views import PaginatorListView
+from posts import views
+from posts.cards import GROUP, card_cache_key
+from posts.models import Group, Post, Comment, Follow, TimelineEntry
 
-from yatube.settings import POSTS_COUNT_ON_PAGE
+from yatube.settings import COMMENTS_COUNT_ON_PAGE, POSTS_COUNT_ON_PAGE
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+COMMENTS_BADGE = re.compile(
+    r'Комментарии\s*<span class="btn btn-secondary badge count">(\d+)<'
+)
 
 User = get_user_model()
 
@@ -296,6 +315,393 @@ class PaginatorTests(TestCase):
             'Пост попал в группу, для которой не был предназначен'
         )
 
+    @override_settings(CACHE_TIMEOUT_LISTVIEW=0)
+    def test_feed_count_is_cached(self):
+        """Количество постов считается заново только после нового поста"""
+        def count_queries(url):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.authorized_client.get(url)
+            return response, [
+                query['sql'] for query in queries
+                if 'COUNT(' in query['sql']
+            ]
+
+        url = self.paginator_page_reverse_names[1]
+        response, queries = count_queries(url)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('ORDER BY', queries[0])
+        self.assertEqual(
+            response.context['paginator'].count, self.POSTS_COUNT_FOR_TESTS
+        )
+        _, queries = count_queries(url)
+        self.assertEqual(queries, [], 'Количество постов не закэшировано')
+        Post.objects.create(
+            author=self.user, text='Новый пост', group=self.groups[0]
+        )
+        response, queries = count_queries(url)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            response.context['paginator'].count,
+            self.POSTS_COUNT_FOR_TESTS + 1
+        )
+
+    def test_page_window_is_elided(self):
+        """Навигация показывает только соседние, первую и последнюю страницы"""
+        with mock.patch.object(PaginatorListView, 'paginate_by', 1):
+            response = self.authorized_client.get(
+                reverse('posts:index'), {'page': 7}
+            )
+        ellipsis = response.context['paginator'].ELLIPSIS
+        self.assertEqual(
+            response.context['page_window'],
+            [1, ellipsis, 5, 6, 7, 8, 9, ellipsis, self.POSTS_COUNT_FOR_TESTS]
+        )
+        content = response.content.decode()
+        self.assertEqual(content.count('?page=2"'), 0)
+        self.assertEqual(content.count('?page=9"'), 2)
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.POSTS_COUNT_FOR_TESTS: int = 13
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+                group=cls.group,
+            ) for i in range(cls.POSTS_COUNT_FOR_TESTS)
+        ]
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+        patcher = mock.patch.object(
+            PaginatorListView, 'cursor_pagination', True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсорная пагинация проходит ленту вперед и назад без повторов"""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        first_page = self.authorized_client.get(url).context['page_obj']
+        self.assertEqual(len(first_page), POSTS_COUNT_ON_PAGE)
+        self.assertFalse(first_page.has_previous())
+        last_page = self.authorized_client.get(
+            url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            len(last_page), self.POSTS_COUNT_FOR_TESTS - POSTS_COUNT_ON_PAGE
+        )
+        self.assertFalse(last_page.has_next())
+        self.assertEqual(
+            [post.id for post in [*first_page, *last_page]],
+            [post.id for post in reversed(self.posts)],
+            'Курсорная пагинация нарушает порядок ленты'
+        )
+        previous_page = self.authorized_client.get(
+            url, {'cursor': last_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(previous_page), list(first_page))
+
+    def test_invalid_cursor_returns_404(self):
+        """Поврежденный курсор приводит к странице 404"""
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.COMMENTS_COUNT_FOR_TESTS: int = 13
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.comments = [
+            Comment.objects.create(
+                author=cls.user,
+                post=cls.post,
+                text=f'Комментарий {i}',
+            ) for i in range(cls.COMMENTS_COUNT_FOR_TESTS)
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_post_detail_shows_first_comments_page(self):
+        """Страница поста выводит только первую порцию новых комментариев"""
+        response = self.guest_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        ))
+        comments_page = response.context['comments_page']
+        self.assertEqual(
+            list(comments_page),
+            self.comments[::-1][:COMMENTS_COUNT_ON_PAGE],
+            'Первая порция комментариев выведена неверно'
+        )
+        self.assertContains(response, comments_page.next_cursor)
+
+    def test_load_more_returns_next_comments(self):
+        """Фрагмент «Показать еще» возвращает следующую порцию"""
+        first_page = self.guest_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )).context['comments_page']
+        response = self.guest_client.get(
+            reverse('posts:comments', kwargs={'post_id': self.post.id}),
+            {'cursor': first_page.next_cursor}
+        )
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            list(response.context['page_obj']),
+            self.comments[::-1][COMMENTS_COUNT_ON_PAGE:],
+            'Следующая порция комментариев выведена неверно'
+        )
+        self.assertNotContains(response, 'data-load-more')
+
+    def test_load_more_for_missing_post_is_not_found(self):
+        """Фрагмент комментариев несуществующего поста отдает 404"""
+        post = Post.objects.create(author=self.user, text='Удаляемый пост')
+        url = reverse('posts:comments', kwargs={'post_id': post.id})
+        self.assertEqual(self.guest_client.get(url).status_code, 200)
+        post.delete()
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+        missing = reverse('posts:comments', kwargs={'post_id': 10 ** 6})
+        self.assertEqual(self.guest_client.get(missing).status_code, 404)
+
+
+@override_settings(CACHE_TIMEOUT_LISTVIEW=0)
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            group=self.group,
+        )
+        self.url = reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug}
+        )
+
+    def get_card_key(self):
+        post = Post.objects.select_related(
+            'author__stats', 'group'
+        ).get(pk=self.post.pk)
+        return card_cache_key(post, GROUP)
+
+    def test_warm_page_uses_cached_cards(self):
+        """Прогретая страница собирается из готовых карточек"""
+        self.guest_client.get(self.url)
+        self.assertIsNotNone(cache.get(self.get_card_key()),
+                             'Карточка поста не сохранена в кэш')
+        cache.set(self.get_card_key(), 'Карточка из кэша')
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Карточка из кэша')
+
+    def test_feed_renders_excerpt_without_full_text(self):
+        """Лента не загружает полный текст и показывает анонс"""
+        Post.objects.filter(pk=self.post.pk).update(
+            text='<p>Полный текст</p>', excerpt='Анонс поста'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Анонс поста')
+        self.assertNotContains(response, 'Полный текст')
+        self.assertFalse(any(
+            '"posts_post"."text"' in query['sql']
+            for query in queries.captured_queries
+        ))
+
+    def test_edited_post_card_is_rendered_again(self):
+        """После правки поста карточка рендерится заново"""
+        self.guest_client.get(self.url)
+        self.post.text = 'Измененный текст'
+        self.post.save()
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, 'Измененный текст')
+
+    def test_card_follows_comments_count(self):
+        """Карточка в ленте показывает новый счетчик комментариев"""
+        self.guest_client.get(self.url)
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        content = self.guest_client.get(self.url).content.decode()
+        self.assertEqual(COMMENTS_BADGE.findall(content), ['1'])
+        comment.delete()
+        content = self.guest_client.get(self.url).content.decode()
+        self.assertEqual(COMMENTS_BADGE.findall(content), ['0'])
+
+
+class SharedPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='auth', first_name='Автор'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', first_name='Читатель'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        cache.clear()
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+        self.edit_url = reverse(
+            'posts:post_edit', kwargs={'post_id': self.post.id}
+        )
+
+    def test_page_cached_once_for_all_users(self):
+        """Общая страница из кэша отдается и авторизованным пользователям"""
+        self.guest_client.get(self.url)
+        response = self.reader_client.get(self.url)
+        self.assertTemplateNotUsed(
+            response, 'posts/post_detail.html',
+            'Авторизованный пользователь не получил страницу из кэша'
+        )
+        self.assertContains(response, 'Привет')
+        self.assertContains(response, 'Читатель')
+        self.assertContains(response, 'Добавить комментарий')
+        self.assertNotContains(response, self.edit_url)
+
+    def test_user_fragments_do_not_leak(self):
+        """Пользовательские фрагменты не попадают в кэш других посетителей"""
+        self.author_client.get(self.url)
+        author_response = self.author_client.get(self.url)
+        self.assertContains(author_response, self.edit_url)
+        guest_response = self.guest_client.get(self.url)
+        self.assertTemplateNotUsed(guest_response, 'posts/post_detail.html')
+        self.assertNotContains(guest_response, self.edit_url)
+        self.assertNotContains(guest_response, 'Привет')
+        self.assertNotContains(guest_response, 'Добавить комментарий')
+
+    def test_forged_hole_is_ignored(self):
+        """Метка фрагмента без подписи не рендерится"""
+        Post.objects.create(
+            author=self.author,
+            text='<!--hole:comment_form-->'
+        )
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+
+
+class PageScopesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group1 = Group.objects.create(title='Группа 1', slug='group1')
+        cls.group2 = Group.objects.create(title='Группа 2', slug='group2')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост в группе', group=cls.group1
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.other, text='Другой пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def is_cached(self, url):
+        response = self.client.get(url)
+        return 'base.html' not in [
+            template.name for template in response.templates
+        ]
+
+    def comments_counts(self, url):
+        return [
+            int(count) for count in COMMENTS_BADGE.findall(
+                self.client.get(url).content.decode()
+            )
+        ]
+
+    def test_comment_updates_counts_on_feeds(self):
+        """Комментарий обновляет счетчик в лентах и сбрасывает свой пост"""
+        feeds = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=(self.group1.slug,)),
+            'profile': reverse('posts:profile', args=(self.author.username,)),
+        }
+        other = reverse('posts:post_detail', args=(self.other_post.pk,))
+        detail = reverse('posts:post_detail', args=(self.post.pk,))
+        for url in (*feeds.values(), other, detail):
+            self.client.get(url)
+        comment = Comment.objects.create(
+            post=self.post, author=self.other, text='Комментарий'
+        )
+        for name, url in feeds.items():
+            with self.subTest(page=name):
+                self.assertEqual(sum(self.comments_counts(url)), 1)
+        self.assertFalse(self.is_cached(detail))
+        self.assertTrue(self.is_cached(other))
+        comment.delete()
+        for name, url in feeds.items():
+            with self.subTest(page=name):
+                self.assertEqual(sum(self.comments_counts(url)), 0)
+
+    def test_moved_post_invalidates_both_groups(self):
+        """Перенос поста сбрасывает страницы старой и новой группы"""
+        old_group = reverse('posts:group_list', args=(self.group1.slug,))
+        new_group = reverse('posts:group_list', args=(self.group2.slug,))
+        other_profile = reverse('posts:profile', args=(self.other.username,))
+        for url in (old_group, new_group, other_profile):
+            self.client.get(url)
+        self.post.group = self.group2
+        self.post.save()
+        self.assertNotContains(self.client.get(old_group), 'Пост в группе')
+        self.assertContains(self.client.get(new_group), 'Пост в группе')
+        self.assertTrue(self.is_cached(other_profile))
+
+    def test_unfollow_loads_author_once(self):
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        url = reverse('posts:profile_unfollow', args=(self.author.username,))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(Follow.objects.filter(user=reader).exists())
+        self.assertEqual(
+            [query['sql'] for query in queries.captured_queries
+             if query["sql"].endswith(
+                 f'"auth_user"."id" = {self.author.pk} LIMIT 21')], [],
+            'Автор подписки загружается отдельным запросом'
+        )
+
 
 class FollowTests(TestCase):
     @classmethod
@@ -395,3 +801,209 @@ class FollowTests(TestCase):
             response_unfollower.content,
             'Ленты подписанного и неподписанного пользователей одинаковы'
         )
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост автора попадает в материализованную ленту подписчика"""
+        Follow.objects.create(user=FollowTests.user2, author=FollowTests.user1)
+        new_post = Post.objects.create(
+            author=FollowTests.user1, text='Новый пост'
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']],
+            [new_post.id, FollowTests.post.id],
+            'Лента подписок не содержит новый пост автора'
+        )
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=FollowTests.user3
+        ).exists(), 'Пост попал в ленту неподписанного пользователя')
+
+    def test_unfollow_prunes_timeline(self):
+        """После отписки посты автора исчезают из ленты"""
+        Follow.objects.create(user=FollowTests.user2, author=FollowTests.user1)
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': FollowTests.user1}
+        ))
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=FollowTests.user2
+        ).exists(), 'После отписки лента не очищена')
+
+    @override_settings(TIMELINE_LENGTH=10)
+    def test_timeline_is_capped(self):
+        """Материализованная лента не растет сверх лимита"""
+        Follow.objects.create(user=FollowTests.user2, author=FollowTests.user1)
+        for i in range(20):
+            Post.objects.create(author=FollowTests.user1, text=f'Пост {i}')
+        self.assertLessEqual(
+            TimelineEntry.objects.filter(user=FollowTests.user2).count(),
+            11,
+            'Лента подписок не обрезается до лимита'
+        )
+
+
+@override_settings(CACHE_TIMEOUT_LISTVIEW=0)
+class AsyncViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание группы',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Тестовый пост {i}', group=cls.group
+            ) for i in range(POSTS_COUNT_ON_PAGE + 3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Комментарий'
+        )
+        cls.cases = (
+            (views.PostListView, views.PostListAsyncView, {}),
+            (views.GroupListView, views.GroupListAsyncView,
+             {'slug': cls.group.slug}),
+            (views.ProfileListView, views.ProfileListAsyncView,
+             {'username': cls.user.username}),
+            (views.PostDetailView, views.PostDetailAsyncView,
+             {'post_id': cls.posts[0].id}),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    async def render_async(self, view, path='/', **kwargs):
+        request = AsyncRequestFactory().get(path)
+        request.user = AnonymousUser()
+        return await view.as_view()(request, **kwargs)
+
+    def render_sync(self, view, path='/', **kwargs):
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        return view.as_view()(request, **kwargs).render()
+
+    async def test_async_views_match_sync_views(self):
+        """Асинхронные представления отдают те же страницы"""
+        for sync_view, async_view, kwargs in self.cases:
+            for path in ('/', '/?page=2'):
+                with self.subTest(view=async_view.__name__, path=path):
+                    expected = await sync_to_async(self.render_sync)(
+                        sync_view, path, **kwargs
+                    )
+                    response = await self.render_async(
+                        async_view, path, **kwargs
+                    )
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(
+                        response.content.decode(), expected.content.decode()
+                    )
+
+    async def test_async_views_raise_404(self):
+        """Асинхронные представления возвращают 404 для чужих адресов"""
+        cases = (
+            (views.GroupListAsyncView, {'slug': 'missing'}),
+            (views.ProfileListAsyncView, {'username': 'missing'}),
+            (views.PostDetailAsyncView, {'post_id': 0}),
+            (views.PostListAsyncView, {'page': 100}),
+        )
+        for view, kwargs in cases:
+            with self.subTest(view=view.__name__):
+                with self.assertRaises(Http404):
+                    await self.render_async(view, **kwargs)
+
+
+@override_settings(CACHE_TIMEOUT_LISTVIEW=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        # Свой каталог: TEMP_MEDIA_ROOT удаляют тесты из других процессов
+        self.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+
+    def test_thumbnails_are_generated_by_worker(self):
+        """Миниатюры создает воркер, а не рендеринг страницы"""
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(
+                'thumb.gif', self.small_gif, content_type='image/gif'
+            ),
+        })
+        post = Post.objects.get()
+        self.assertTrue(
+            ThumbnailJob.objects.filter(source=post.image.name).exists(),
+            'Изображение не поставлено в очередь'
+        )
+        cache_dir = os.path.join(self.media_root, 'cache')
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertFalse(
+            os.path.exists(cache_dir), 'Миниатюра создана при рендеринге'
+        )
+        self.assertNotContains(response, '/media/cache/')
+        call_command('generate_thumbnails', stdout=StringIO())
+        self.assertFalse(ThumbnailJob.objects.exists())
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, '/media/cache/')
+        detail = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertContains(detail, '/media/cache/')
+
+    def test_locked_source_is_skipped(self):
+        """Файл, который обрабатывает другой процесс, пропускается"""
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                'locked.gif', self.small_gif, content_type='image/gif'
+            ),
+        )
+        with generation_lock(post.image.name) as acquired:
+            self.assertTrue(acquired)
+            call_command('generate_thumbnails', stdout=StringIO())
+        self.assertTrue(ThumbnailJob.objects.exists())
+        call_command('generate_thumbnails', stdout=StringIO())
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_page_thumbnails_fetched_at_once(self):
+        """Миниатюры страницы ищутся в kvstore одним запросом"""
+        for i in range(3):
+            Post.objects.create(
+                author=self.user,
+                text=f'Пост с картинкой {i}',
+                image=SimpleUploadedFile(
+                    f'batch{i}.gif', self.small_gif, content_type='image/gif'
+                ),
+            )
+        call_command('generate_thumbnails', stdout=StringIO())
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(
+            response.content.decode().count('/media/cache/'), 3
+        )
+        kvstore_queries = [
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db.models import Count
+
+from posts.models import Follow, Post, TimelineEntry
+
+FAN_OUT_BATCH_SIZE = 500
+
+
+def trim_timelines(user_ids) -> None:
+    """Обрезает ленты, выросшие сверх TIMELINE_LENGTH.
+
+    Чтобы не удалять по одной записи на каждый новый пост, лента
+    обрезается, только когда превышает лимит на десятую часть.
+    """
+    limit = settings.TIMELINE_LENGTH
+    overflowed = TimelineEntry.objects.filter(
+        user__in=user_ids
+    ).order_by().values('user').annotate(
+        size=Count('pk')
+    ).filter(size__gt=limit + limit // 10).values_list('user', flat=True)
+    for user_id in overflowed:
+        stale = list(TimelineEntry.objects.filter(
+            user_id=user_id
+        ).order_by('-created', '-pk').values_list('pk', flat=True)[limit:])
+        TimelineEntry.objects.filter(pk__in=stale).delete()
+
+
+def fan_out_post(post: Post) -> None:
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    followers = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user', flat=True))
+    if not followers:
+        return
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post,
+                       author_id=post.author_id, created=post.created)
+         for user_id in followers),
+        batch_size=FAN_OUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_timelines(followers)
+
+
+def backfill_timeline(user_id: int, author_id: int) -> None:
+    """Переносит последние посты автора в ленту нового подписчика."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-created'
+    ).values_list('pk', 'created')[:settings.TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id,
+                       author_id=author_id, created=created)
+         for post_id, created in posts),
+        batch_size=FAN_OUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_timelines([user_id])
+
+
+def prune_timeline(user_id: int, author_id: int) -> None:
+    """Убирает посты автора из ленты бывшего подписчика."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
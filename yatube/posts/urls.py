@@ -1,33 +1,55 @@
 from django.conf import settings
 from django.urls import path
-from django.views.decorators.cache import cache_page
 
+from core.cache import cache_shared_page
 from posts import views
 
+if settings.ASYNC_VIEWS:
+    post_list = views.PostListAsyncView
+    group_list = views.GroupListAsyncView
+    profile = views.ProfileListAsyncView
+    post_detail = views.PostDetailAsyncView
+else:
+    post_list = views.PostListView
+    group_list = views.GroupListView
+    profile = views.ProfileListView
+    post_detail = views.PostDetailView
+
 app_name = 'posts'
 urlpatterns = [
     path(
         '',
-        cache_page(
-            settings.CACHE_TIMEOUT_LISTVIEW, key_prefix='index_page'
-        )(views.PostListView.as_view()),
+        cache_shared_page('index_page', 'posts')(post_list.as_view()),
         name='index'
     ),
     path(
         'group/<slug:slug>/',
-        views.GroupListView.as_view(),
+        cache_shared_page('group_page', 'group:{slug}')(
+            group_list.as_view()
+        ),
         name='group_list'
     ),
     path(
         'profile/<str:username>/',
-        views.ProfileListView.as_view(),
+        cache_shared_page('profile_page', 'profile:{username}')(
+            profile.as_view()
+        ),
         name='profile'
     ),
     path(
         'posts/<int:post_id>/',
-        views.PostDetailView.as_view(),
+        cache_shared_page('post_page', 'post:{post_id}')(
+            post_detail.as_view()
+        ),
         name='post_detail'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        cache_shared_page('comments_page', 'comments:{post_id}')(
+            views.CommentListView.as_view()
+        ),
+        name='comments'
+    ),
     path(
         'create/',
         views.PostCreateView.as_view(),
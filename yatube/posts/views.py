@@ -1,39 +1,74 @@
-import os
 from core.permissions import AuthorPermissionMixin
-from core.views import PaginatorListView
+from core.paginators import CursorPaginator
+from core.views import AsyncListMixin, PaginatorListView
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views import View
 from django.views.generic import DeleteView, DetailView, FormView, UpdateView
 
+from posts import cards
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Group, Post, User
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
 
 
-class PostListView(PaginatorListView):
-    queryset = Post.objects.annotate(
-        author_posts_count=Count('author__posts', distinct=True),
-        group_posts_count=Count('group__posts', distinct=True)
-    ).select_related('group', 'author').order_by('-created')
+class PostCardsMixin:
+    card_variant = cards.FEED
+    post_cards = None
+
+    def get_card_posts(self, context):
+        return context['object_list']
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['card_variant'] = self.card_variant
+        if self.post_cards is None:
+            self.post_cards = cards.get_cached_cards(
+                self.get_card_posts(context), self.card_variant
+            )
+        context['post_cards'] = self.post_cards
+        context['thumbnails'] = cards.prefetch_thumbnails(
+            post for post in self.get_card_posts(context)
+            if post.pk not in self.post_cards
+        )
+        return context
+
+    async def aload_post_cards(self, posts):
+        self.post_cards = await cards.aget_cached_cards(
+            posts, self.card_variant
+        )
+
+
+class PostListView(PostCardsMixin, PaginatorListView):
+    queryset = Post.objects.select_related(
+        'group', 'author__stats'
+    ).defer('text', 'text_html').order_by('-created')
     template_name = 'posts/index.html'
+    count_cache_key = 'index'
     extra_context = {'index_page': True,
                      'title': 'Последние обновления',
                      }
 
 
-class GroupListView(PaginatorListView):
+class GroupListView(PostCardsMixin, PaginatorListView):
     template_name = 'posts/group_list.html'
+    card_variant = cards.GROUP
+    count_cache_key = 'group:{slug}'
+    group = None
 
     def get_queryset(self):
-        return Post.objects.select_related('author').annotate(
-            author_posts_count=Count('author__posts', distinct=True)
-        ).filter(group__slug=self.kwargs['slug']).order_by('-created')
+        return Post.objects.select_related('group', 'author__stats').filter(
+            group__slug=self.kwargs['slug']
+        ).defer('text', 'text_html').order_by('-created')
 
     def get_object(self):
-        return get_object_or_404(Group, slug=self.kwargs['slug'])
+        if self.group is None:
+            self.group = get_object_or_404(Group, slug=self.kwargs['slug'])
+        return self.group
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -41,44 +76,125 @@ class GroupListView(PaginatorListView):
         return context
 
 
-class ProfileListView(PaginatorListView):
+class ProfileListView(PostCardsMixin, PaginatorListView):
     template_name = 'posts/profile.html'
+    card_variant = cards.PROFILE
+    count_cache_key = 'profile:{username}'
+    author = None
 
     def get_queryset(self):
-        return Post.objects.annotate(
-            group_posts_count=Count('group__posts', distinct=True)
-        ).select_related('group', 'author').filter(
+        return Post.objects.select_related('group', 'author__stats').filter(
             author__username=self.kwargs['username']
-        ).order_by('-created')
+        ).defer('text', 'text_html').order_by('-created')
+
+    def get_author_queryset(self):
+        return User.objects.select_related('stats').filter(
+            username=self.kwargs['username']
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        author = get_object_or_404(User, username=self.kwargs['username'])
-        user = self.request.user
-        if user.is_authenticated:
-            my_posts_flag = author == user
-            context['my_posts_flag'] = my_posts_flag
-            following = Follow.objects.select_related(
-                'author', 'user'
-            ).filter(author=author, user=user).exists()
-            context['following'] = following
-        context['author'] = author
+        if self.author is None:
+            self.author = get_object_or_404(self.get_author_queryset())
+        context['author'] = self.author
         context['profile'] = True
         return context
 
 
-class PostDetailView(DetailView):
+class PostDetailView(PostCardsMixin, DetailView):
     template_name = 'posts/post_detail.html'
+    card_variant = cards.DETAIL
+    comments_page = None
+
+    def get_post_queryset(self):
+        return Post.objects.select_related('group', 'author__stats').filter(
+            id=self.kwargs['post_id']
+        ).defer('text')
 
     def get_object(self):
-        return get_object_or_404(Post.objects.annotate(
-            author_posts_count=Count('author__posts', distinct=True),
-            group_posts_count=Count('group__posts', distinct=True)
-        ).prefetch_related('comments__author'), id=self.kwargs['post_id'])
+        return get_object_or_404(self.get_post_queryset())
+
+    def get_card_posts(self, context):
+        return [context['object']]
+
+    def get_comments_paginator(self):
+        return CursorPaginator(
+            self.object.comments.select_related('author').defer('text'),
+            settings.COMMENTS_COUNT_ON_PAGE
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = CommentForm(self.request.POST or None)
+        if self.comments_page is None:
+            self.comments_page = self.get_comments_paginator().page()
+        context['comments_page'] = self.comments_page
+        return context
+
+
+class AsyncFeedMixin(AsyncListMixin):
+    async def aprepare(self):
+        await super().aprepare()
+        await self.aload_post_cards(self.async_pagination[2])
+
+
+class PostListAsyncView(AsyncFeedMixin, PostListView):
+    pass
+
+
+class GroupListAsyncView(AsyncFeedMixin, GroupListView):
+    async def aprepare(self):
+        try:
+            self.group = await Group.objects.aget(slug=self.kwargs['slug'])
+        except Group.DoesNotExist:
+            raise Http404('Группа не найдена')
+        await super().aprepare()
+
+
+class ProfileListAsyncView(AsyncFeedMixin, ProfileListView):
+    async def aprepare(self):
+        try:
+            self.author = await self.get_author_queryset().aget()
+        except User.DoesNotExist:
+            raise Http404('Автор не найден')
+        await super().aprepare()
+
+
+class PostDetailAsyncView(PostDetailView):
+    async def get(self, request, *args, **kwargs):
+        try:
+            self.object = await self.get_post_queryset().aget()
+        except Post.DoesNotExist:
+            raise Http404('Запись не найдена')
+        self.comments_page = await self.get_comments_paginator().apage()
+        await self.aload_post_cards([self.object])
+        context = await sync_to_async(self.get_context_data)(
+            object=self.object
+        )
+        response = self.render_to_response(context)
+        return await sync_to_async(response.render)()
+
+
+class CommentListView(PaginatorListView):
+    """Следующая порция комментариев для кнопки «Показать еще»"""
+    template_name = 'posts/includes/comment_list.html'
+    paginate_by = settings.COMMENTS_COUNT_ON_PAGE
+    cursor_pagination = True
+    pagination_template_name = None
+
+    def get(self, request, *args, **kwargs):
+        if not Post.objects.filter(pk=self.kwargs['post_id']).exists():
+            raise Http404('Запись не найдена')
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return Comment.objects.select_related('author').filter(
+            post_id=self.kwargs['post_id']
+        ).defer('text')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['post_id'] = self.kwargs['post_id']
         return context
 
 
@@ -100,7 +216,7 @@ class PostCreateView(LoginRequiredMixin, FormView):
 
 class PostUpdateView(AuthorPermissionMixin, UpdateView):
     model = Post
-    fields = ('text', 'group', 'image',)
+    form_class = PostForm
     pk_url_kwarg = 'post_id'
     template_name = "posts/create.html"
     extra_context = {'is_edit': True}
@@ -117,11 +233,6 @@ class PostDeleteView(AuthorPermissionMixin, DeleteView):
     success_url = '/'
     extra_context = {'form_title': 'Подтверждение удаления'}
 
-    def post(self, request, *args, **kwargs):
-        if self.get_object().image:
-            os.remove(self.get_object().image.path)
-        return super().post(request, *args, **kwargs)
-
 
 class CommentCreateView(LoginRequiredMixin, FormView):
     form_class = CommentForm
@@ -141,20 +252,25 @@ class CommentCreateView(LoginRequiredMixin, FormView):
         return super().form_valid(form)
 
 
-class FollowListView(LoginRequiredMixin, PaginatorListView):
+class FollowListView(LoginRequiredMixin, PostCardsMixin, PaginatorListView):
     template_name = 'posts/follow.html'
+    count_cache_key = 'follow:{user_id}'
+    count_cache_scopes = ('feeds', 'timeline:{user_id}')
 
     def get_queryset(self):
-        return Post.objects.annotate(
-            author_posts_count=Count('author__posts', distinct=True),
-            group_posts_count=Count('group__posts', distinct=True)
-        ).select_related('author', 'group').filter(
-            author__following__user=self.request.user
-        ).order_by('-created')
+        return Post.objects.select_related('author__stats', 'group').filter(
+            timeline_entries__user=self.request.user
+        ).defer('text', 'text_html').order_by('-timeline_entries__created')
+
+    def get_count_queryset(self, queryset):
+        return TimelineEntry.objects.filter(user=self.request.user)
+
+    def get_count_cache_kwargs(self):
+        return {'user_id': self.request.user.pk}
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['following'] = self.get_queryset().exists()
+        context['following'] = bool(context['object_list'])
         context['index'] = False
         context['title'] = 'Посты избранных авторов'
         return context
@@ -175,7 +291,7 @@ class ProfileUnfollowView(LoginRequiredMixin, View):
         if not request.user.is_authenticated:
             return self.handle_no_permission()
         get_object_or_404(
-            Follow,
+            Follow.objects.select_related('author'),
             user=request.user,
             author__username=kwargs['username']
         ).delete()
@@ -0,0 +1,17 @@
+from search.index import is_available, make_match, match_sql
+
+
+class FullTextSearchMixin:
+    """Поиск в админке через индекс FTS5 вместо LIKE по search_fields."""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not (self.search_kind and is_available() and make_match(
+            search_term
+        )):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(
+            pk__in=match_sql(self.search_kind, search_term)
+        ), False
@@ -0,0 +1,169 @@
+"""Полнотекстовый индекс записей, комментариев и групп на SQLite FTS5.
+
+Индекс — виртуальная таблица ``search_index`` с колонками title и body
+и служебными kind и object_id. rowid документа вычисляется из типа и
+первичного ключа, поэтому документ заменяется без поиска по таблице.
+
+Ранжирование bm25 обходит все совпадения, и для частых слов это дорого.
+Поэтому ранжируются только SEARCH_CANDIDATES самых новых совпадений:
+FTS5 отдает их по убыванию rowid без сортировки, а границу по rowid
+можно наложить на основной запрос. Индексы префиксов из 2 и 3 символов
+ускоряют поиск по началу последнего слова.
+"""
+import re
+from html import escape
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.safestring import mark_safe
+
+from posts.excerpts import plain_text
+from posts.models import Comment, Group, Post
+
+TABLE = 'search_index'
+POST = 'post'
+COMMENT = 'comment'
+GROUP = 'group'
+KINDS = {POST: 1, COMMENT: 2, GROUP: 3}
+MODELS = {POST: Post, COMMENT: Comment, GROUP: Group}
+FIELDS = {
+    POST: ('pk', 'text'),
+    COMMENT: ('pk', 'text'),
+    GROUP: ('pk', 'title', 'description'),
+}
+MAX_TERMS = 10
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+SNIPPET_TOKENS = 24
+TITLE_WEIGHT = 5.0
+WORD = re.compile(r'\w+')
+
+
+def is_available(using=connection) -> bool:
+    return using.vendor == 'sqlite'
+
+
+def get_kind(instance):
+    for kind, model in MODELS.items():
+        if isinstance(instance, model):
+            return kind
+    return None
+
+
+def make_rowid(kind: str, object_id: int) -> int:
+    return object_id * 4 + KINDS[kind]
+
+
+def make_document(kind: str, instance) -> tuple:
+    if kind == GROUP:
+        title, body = instance.title, instance.description
+    else:
+        title, body = '', plain_text(instance.text)
+    return (make_rowid(kind, instance.pk), title, body, kind, instance.pk)
+
+
+def iter_documents(kind: str, chunk_size=2000):
+    queryset = MODELS[kind].objects.only(*FIELDS[kind]).order_by()
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        yield make_document(kind, instance)
+
+
+def write_documents(documents) -> None:
+    documents = list(documents)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {TABLE} WHERE rowid = %s',
+            [(document[0],) for document in documents]
+        )
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, title, body, kind, object_id) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            documents
+        )
+
+
+def index_object(instance) -> None:
+    kind = get_kind(instance)
+    if kind and is_available():
+        write_documents([make_document(kind, instance)])
+
+
+def remove_object(instance) -> None:
+    kind = get_kind(instance)
+    if kind and is_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid = %s',
+                [make_rowid(kind, instance.pk)]
+            )
+
+
+def rebuild(batch_size=2000) -> int:
+    """Заполняет индекс заново, возвращает число документов."""
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    for kind in MODELS:
+        batch = []
+        for document in iter_documents(kind, batch_size):
+            batch.append(document)
+            if len(batch) >= batch_size:
+                write_documents(batch)
+                total += len(batch)
+                batch = []
+        write_documents(batch)
+        total += len(batch)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+    return total
+
+
+def make_match(query: str) -> str:
+    """Запрос FTS5 из слов пользователя: все слова, последнее — префикс.
+
+    Каждое слово берется в кавычки, поэтому операторы FTS5 из ввода не
+    работают и не дают синтаксических ошибок.
+    """
+    terms = WORD.findall(query)[:MAX_TERMS]
+    if not terms:
+        return ''
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+def match_sql(kind: str, query: str) -> RawSQL:
+    """Подзапрос с ключами объектов kind, подходящих под query."""
+    return RawSQL(
+        f'SELECT object_id FROM {TABLE} WHERE {TABLE} MATCH %s '
+        'AND kind = %s',
+        (make_match(query), kind)
+    )
+
+
+def highlight(snippet: str) -> str:
+    return mark_safe(escape(snippet).replace(
+        HIGHLIGHT_START, '<mark>'
+    ).replace(HIGHLIGHT_END, '</mark>'))
+
+
+def search(query: str, offset: int, limit: int) -> list:
+    """Документы по релевантности: словари kind, object_id и snippet."""
+    match = make_match(query)
+    if not match or not is_available():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT kind, object_id, snippet({TABLE}, -1, %s, %s, %s, %s) '
+            f'FROM {TABLE} WHERE {TABLE} MATCH %s AND rowid >= ('
+            f'SELECT coalesce(min(rowid), 0) FROM ('
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s '
+            'ORDER BY rowid DESC LIMIT %s)) '
+            f'ORDER BY bm25({TABLE}, %s, 1.0) LIMIT %s OFFSET %s',
+            [HIGHLIGHT_START, HIGHLIGHT_END, '…', SNIPPET_TOKENS, match,
+             match, settings.SEARCH_CANDIDATES, TITLE_WEIGHT, limit, offset]
+        )
+        rows = cursor.fetchall()
+    return [
+        {'kind': kind, 'object_id': object_id, 'snippet': highlight(snippet)}
+        for kind, object_id, snippet in rows
+    ]
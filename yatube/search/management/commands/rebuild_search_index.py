@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from search.index import rebuild
+
+
+class Command(BaseCommand):
+    help = ('Заново заполняет полнотекстовый индекс записей, комментариев '
+            'и групп')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано документов: {total}'
+        ))
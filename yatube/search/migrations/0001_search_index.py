@@ -0,0 +1,67 @@
+from django.db import migrations
+
+from posts.excerpts import plain_text
+
+TABLE = 'search_index'
+BATCH_SIZE = 2000
+# Копия search.index на момент миграции: rowid = object_id * 4 + kind
+KINDS = {'post': 1, 'comment': 2, 'group': 3}
+
+
+def is_available(connection):
+    return connection.vendor == 'sqlite'
+
+
+def iter_documents(apps):
+    for kind, model_name in (('post', 'Post'), ('comment', 'Comment')):
+        model = apps.get_model('posts', model_name)
+        for pk, text in model.objects.order_by().values_list(
+            'pk', 'text'
+        ).iterator(chunk_size=BATCH_SIZE):
+            yield pk * 4 + KINDS[kind], '', plain_text(text), kind, pk
+    Group = apps.get_model('posts', 'Group')
+    for pk, title, description in Group.objects.order_by().values_list(
+        'pk', 'title', 'description'
+    ).iterator(chunk_size=BATCH_SIZE):
+        yield pk * 4 + KINDS['group'], title, description, 'group', pk
+
+
+def write_documents(cursor, documents):
+    cursor.executemany(
+        f'INSERT INTO {TABLE} (rowid, title, body, kind, object_id) '
+        'VALUES (%s, %s, %s, %s, %s)', documents
+    )
+
+
+def create_index(apps, schema_editor):
+    if not is_available(schema_editor.connection):
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+        'title, body, kind UNINDEXED, object_id UNINDEXED, '
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for document in iter_documents(apps):
+            batch.append(document)
+            if len(batch) >= BATCH_SIZE:
+                write_documents(cursor, batch)
+                batch = []
+        write_documents(cursor, batch)
+
+
+def drop_index(apps, schema_editor):
+    if is_available(schema_editor.connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_text_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
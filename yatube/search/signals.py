@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts.models import Comment, Group, Post
+from search.index import index_object, remove_object
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Group)
+def index_on_save(sender, instance, raw, **kwargs):
+    if not raw and 'text' not in instance.get_deferred_fields():
+        index_object(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Group)
+def remove_on_delete(sender, instance, **kwargs):
+    remove_object(instance)
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+from search.index import POST, TABLE, search
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='cats',
+            description='Все о домашних животных',
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='<p>Рыжий <b>кот</b> спит на <script>x</script>окне</p>',
+        )
+        self.other = Post.objects.create(
+            author=self.user, text='<p>Про собак и котов</p>'
+        )
+        self.comment = Comment.objects.create(
+            post=self.other, author=self.user, text='Кот <i>спит</i> весь день'
+        )
+
+    def found(self, query):
+        return {
+            (document['kind'], document['object_id'])
+            for document in search(query, 0, 10)
+        }
+
+    def test_index_follows_signals(self):
+        """Индекс обновляется при создании, правке и удалении"""
+        self.assertEqual(self.found('спит'), {
+            (POST, self.post.pk), ('comment', self.comment.pk)
+        })
+        self.assertEqual(self.found('домашних'), {('group', self.group.pk)})
+        self.post.text = 'Рыжий кот проснулся'
+        self.post.save()
+        self.assertEqual(self.found('спит'), {('comment', self.comment.pk)})
+        self.other.delete()
+        self.assertEqual(self.found('спит'), set())
+
+    def test_inline_markup_inside_word(self):
+        """Слово с выделенной частью индексируется целиком"""
+        post = Post.objects.create(
+            author=self.user, text='<p>Пре<b>вед</b> медвед</p>'
+        )
+        self.assertEqual(self.found('превед'), {(POST, post.pk)})
+
+    def test_query_syntax_is_not_interpreted(self):
+        """Операторы FTS5 во вводе не ломают запрос"""
+        self.assertEqual(self.found('рыжий" ('), {(POST, self.post.pk)})
+        self.assertEqual(self.found('"*'), set())
+
+    def test_search_page_shows_highlighted_results(self):
+        """Страница поиска показывает выделенные совпадения"""
+        response = self.client.get(reverse('search:search'), {'q': 'рыжий'})
+        self.assertContains(response, '<mark>Рыжий</mark> кот')
+        self.assertContains(
+            response, reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        response = self.client.get(reverse('search:search'), {'page': 'x'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_search_index восстанавливает индекс"""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+        self.assertEqual(self.found('спит'), set())
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('спит'), {
+            (POST, self.post.pk), ('comment', self.comment.pk)
+        })
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет по индексу"""
+        admin = User.objects.create_superuser(username='admin')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'рыжий'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
@@ -0,0 +1,60 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import Http404
+from django.views.generic import TemplateView
+
+from posts.models import Comment, Group, Post
+from search import index
+
+
+class SearchView(TemplateView):
+    template_name = 'search/search.html'
+    paginate_by = settings.POSTS_COUNT_ON_PAGE
+    query_kwarg = 'q'
+    page_kwarg = 'page'
+
+    def get_page_number(self) -> int:
+        try:
+            number = int(self.request.GET.get(self.page_kwarg, 1))
+        except ValueError:
+            raise Http404('Неверная страница')
+        if not 1 <= number <= settings.SEARCH_CANDIDATES // self.paginate_by:
+            raise Http404('Неверная страница')
+        return number
+
+    def load_objects(self, found) -> dict:
+        """Объекты найденных документов одним запросом на каждый тип."""
+        ids = defaultdict(list)
+        for document in found:
+            ids[document['kind']].append(document['object_id'])
+        return {
+            index.POST: Post.objects.select_related(
+                'author', 'group'
+            ).defer('text', 'text_html').in_bulk(ids[index.POST]),
+            index.COMMENT: Comment.objects.select_related(
+                'author'
+            ).defer('text', 'text_html').in_bulk(ids[index.COMMENT]),
+            index.GROUP: Group.objects.in_bulk(ids[index.GROUP]),
+        }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get(self.query_kwarg, '').strip()
+        number = self.get_page_number()
+        found = index.search(
+            query, (number - 1) * self.paginate_by, self.paginate_by + 1
+        )
+        objects = self.load_objects(found[:self.paginate_by])
+        context['query'] = query
+        context['results'] = [
+            dict(document, object=objects[document['kind']][
+                document['object_id']
+            ])
+            for document in found[:self.paginate_by]
+            if document['object_id'] in objects[document['kind']]
+        ]
+        context['page_number'] = number
+        context['has_previous'] = number > 1
+        context['has_next'] = len(found) > self.paginate_by
+        return context
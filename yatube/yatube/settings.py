@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -35,9 +36,28 @@ ALLOWED_HOSTS = [
     'tarrim.pythonanywhere.com',
 ]
 
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
 # Constants
 POSTS_COUNT_ON_PAGE = 10
-CACHE_TIMEOUT_LISTVIEW = 20
+COMMENTS_COUNT_ON_PAGE = 10
+POST_EXCERPT_WORDS = 25
+CACHE_TIMEOUT_LISTVIEW = 60 * 60 * 6
+CACHE_TIMEOUT_POST_CARD = 60 * 60 * 24
+CACHE_TIMEOUT_FEED_COUNT = 60 * 60 * 24
+CURSOR_PAGINATION = False
+# Асинхронные представления чтения; включается в yatube/asgi.py
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == '1'
+TIMELINE_LENGTH = 1000
+POST_IMAGE_MAX_EDGE = 1600
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_QUALITY = 85
+# Сколько самых новых совпадений ранжирует поиск
+SEARCH_CANDIDATES = 2000
+# Списки админки больше этого числа строк не считаются точно
+ADMIN_EXACT_COUNT_LIMIT = 10000
+# Бюджет времени и SQL-запросов страниц для команды bench_views
+VIEW_BUDGET_FILE = os.path.join(BASE_DIR, 'core', 'view_budget.json')
 
 # Application definition
 INSTALLED_APPS = [
@@ -45,6 +65,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'search.apps.SearchConfig',
 
     # django
     'django.contrib.admin',
@@ -99,6 +120,21 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+
+THUMBNAIL_BACKEND = 'core.thumbnails.PregeneratedThumbnailBackend'
+# Имена миниатюр задает sorl-thumbnail, хеш содержимого им не нужен
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+# Миниатюры, которые используют шаблоны, по полям моделей
+THUMBNAIL_PRESETS = {
+    'posts.Post.image': (
+        ('200', {'upscale': True}),
+        ('800x300', {'upscale': True}),
+    ),
+    'about.About.photo': (
+        ('200', {'upscale': True}),
+    ),
+}
 
 
 # Database
@@ -165,14 +201,38 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 # Media
 MEDIA_URL = '/media/'
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Поля с HTML, в которых могут быть ссылки на файлы MEDIA_ROOT
+MEDIA_TEXT_FIELDS = ('posts.Post.text', 'posts.Comment.text')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Cache
+# Файл общего кэша у каждой копии проекта свой; тесты, в том числе
+# параллельные воркеры, используют отдельный LocMemCache в процессе
+# Страница целиком хранится в одном слоте SharedMemoryCache: значения
+# крупнее слота не кэшируются. Файл кэша разреженный, поэтому большой
+# слот не расходует память на мелких записях.
+CACHE_SLOT_SIZE = int(os.environ.get('YATUBE_CACHE_SLOT_SIZE', 512 * 1024))
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.SharedMemoryCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'shared_cache')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 1024,
+            'SLOT_SIZE': CACHE_SLOT_SIZE,
+        },
     }
 }
+if TESTING:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
 
 # for Django 4
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
@@ -180,6 +240,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 # for CKEditor
 CKEDITOR_UPLOAD_PATH = 'uploads/'
 CKEDITOR_RESTRICT_BY_USER = True
+CKEDITOR_RESTRICT_BY_DATE = False
 CKEDITOR_CONFIGS = {
     'ckeditor_post': {
         'toolbar': 'Custom',
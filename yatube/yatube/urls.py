@@ -25,6 +25,7 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('search/', include('search.urls', namespace='search')),
     path('ckeditor/', include('ckeditor_uploader.urls')),
 ]
 